@@ -3,6 +3,52 @@ import numpy as np
 import talib
 from typing import Dict, List, Tuple
 
+def _window_midpoint(high: np.ndarray, low: np.ndarray, period: int, offset: int = 0) -> float:
+    """
+    (máxima + mínima) / 2 da janela de `period` candles que termina
+    `offset` candles antes do último. NaN se não houver dados suficientes.
+    """
+    end = len(high) - offset
+    if end < period:
+        return np.nan
+    return (high[end - period:end].max() + low[end - period:end].min()) / 2
+
+SR_LEVELS = ('pivot', 'resistance_1', 'resistance_2', 'support_1', 'support_2')
+
+def _pivot_levels(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """
+    Pivot points para arrays de candles
+
+    Returns:
+        Array (n, 5) com os níveis na ordem de SR_LEVELS
+    """
+    pivot = (high + low + close) / 3
+    return np.column_stack([
+        pivot,
+        2 * pivot - low,            # resistance_1
+        pivot + (high - low),       # resistance_2
+        2 * pivot - high,           # support_1
+        pivot - (high - low)        # support_2
+    ])
+
+def _market_strength_score(volume_trend, price_momentum):
+    """Score de força (sem limites) para escalares ou arrays"""
+    return (volume_trend * 0.6 + price_momentum * 0.4) * 100 + 50
+
+# Dados sintéticos usados em calculate_advanced_indicators: série
+# p * (1 + i * 0.01) para i em [-10, 10), máximas/mínimas a ±2%.
+# Só o último candle entra nos pivots, então cada nível é um múltiplo
+# constante do preço atual.
+_SR_CLOSE = 1 + 9 * 0.01
+_SR_HIGH = _SR_CLOSE * 1.02
+_SR_LOW = _SR_CLOSE * 0.98
+SR_MULTIPLIERS = _pivot_levels(np.array([_SR_HIGH]), np.array([_SR_LOW]),
+                               np.array([_SR_CLOSE]))[0]
+
+def _sr_levels_from_price(prices: np.ndarray) -> np.ndarray:
+    """Níveis de S/R (n, 5) da série sintética a partir do preço atual"""
+    return np.outer(prices, SR_MULTIPLIERS)
+
 class AdvancedTechnicalIndicators:
     """
     Indicadores técnicos avançados para análise cripto
@@ -14,19 +60,10 @@ class AdvancedTechnicalIndicators:
         """
         Calcula níveis de suporte e resistência usando pivot points
         """
-        pivot = (high + low + close) / 3
-        r1 = 2 * pivot - low
-        s1 = 2 * pivot - high
-        r2 = pivot + (high - low)
-        s2 = pivot - (high - low)
-        
-        return {
-            'pivot': pivot.iloc[-1],
-            'resistance_1': r1.iloc[-1],
-            'resistance_2': r2.iloc[-1],
-            'support_1': s1.iloc[-1],
-            'support_2': s2.iloc[-1]
-        }
+        levels = _pivot_levels(high.to_numpy(dtype=float)[-1:],
+                               low.to_numpy(dtype=float)[-1:],
+                               close.to_numpy(dtype=float)[-1:])[0]
+        return dict(zip(SR_LEVELS, levels))
     
     @staticmethod
     def calculate_ichimoku_cloud(high: pd.Series, low: pd.Series, close: pd.Series) -> Dict:
@@ -38,25 +75,25 @@ class AdvancedTechnicalIndicators:
         kijun_period = 26
         senkou_b_period = 52
         
-        tenkan_sen = (high.rolling(tenkan_period).max() + 
-                     low.rolling(tenkan_period).min()) / 2
-        kijun_sen = (high.rolling(kijun_period).max() + 
-                    low.rolling(kijun_period).min()) / 2
-        senkou_span_a = (tenkan_sen + kijun_sen) / 2
-        senkou_span_b = (high.rolling(senkou_b_period).max() + 
-                        low.rolling(senkou_b_period).min()) / 2
-        
-        # Deslocar para frente
-        senkou_span_a = senkou_span_a.shift(kijun_period)
-        senkou_span_b = senkou_span_b.shift(kijun_period)
-        
+        h = high.to_numpy(dtype=float)
+        l = low.to_numpy(dtype=float)
+
+        # Só o último valor é usado: calcular extremos apenas nas janelas finais
+        tenkan_sen = _window_midpoint(h, l, tenkan_period)
+        kijun_sen = _window_midpoint(h, l, kijun_period)
+
+        # Senkou spans deslocados para frente: valor de kijun_period candles atrás
+        senkou_span_a = (_window_midpoint(h, l, tenkan_period, kijun_period) +
+                         _window_midpoint(h, l, kijun_period, kijun_period)) / 2
+        senkou_span_b = _window_midpoint(h, l, senkou_b_period, kijun_period)
+
         return {
-            'tenkan_sen': tenkan_sen.iloc[-1],
-            'kijun_sen': kijun_sen.iloc[-1],
-            'senkou_span_a': senkou_span_a.iloc[-1],
-            'senkou_span_b': senkou_span_b.iloc[-1],
-            'chikou_span': close.shift(-kijun_period).iloc[-1],
-            'cloud_bullish': senkou_span_a.iloc[-1] > senkou_span_b.iloc[-1]
+            'tenkan_sen': tenkan_sen,
+            'kijun_sen': kijun_sen,
+            'senkou_span_a': senkou_span_a,
+            'senkou_span_b': senkou_span_b,
+            'chikou_span': close.shift(-kijun_period).iat[-1],
+            'cloud_bullish': senkou_span_a > senkou_span_b
         }
     
     @staticmethod
@@ -85,8 +122,7 @@ class AdvancedTechnicalIndicators:
         price_momentum = price_change.mean()
         
         # Score combinado
-        strength_score = (volume_trend * 0.6 + price_momentum * 0.4) * 100
-        return max(0, min(100, strength_score + 50))
+        return max(0, min(100, _market_strength_score(volume_trend, price_momentum)))
     
     @staticmethod
     def detect_divergence(price: pd.Series, indicator: pd.Series, window: int = 14) -> str:
@@ -96,20 +132,21 @@ class AdvancedTechnicalIndicators:
         if len(price) < window * 2:
             return "INSUFICIENT_DATA"
         
-        price_highs = price.rolling(window).max()
-        indicator_highs = indicator.rolling(window).max()
-        
-        price_lows = price.rolling(window).min()
-        indicator_lows = indicator.rolling(window).min()
-        
+        # Apenas as duas últimas janelas são comparadas
+        p = price.to_numpy(dtype=float)
+        ind = indicator.to_numpy(dtype=float)
+
+        last_p, prev_p = p[-window:], p[-window - 1:-1]
+        last_ind, prev_ind = ind[-window:], ind[-window - 1:-1]
+
         # Verificar divergência de alta
-        if (price_highs.iloc[-1] > price_highs.iloc[-2] and 
-            indicator_highs.iloc[-1] < indicator_highs.iloc[-2]):
+        if (last_p.max() > prev_p.max() and
+            last_ind.max() < prev_ind.max()):
             return "BULLISH_DIVERGENCE"
-        
+
         # Verificar divergência de baixa
-        if (price_lows.iloc[-1] < price_lows.iloc[-2] and 
-            indicator_lows.iloc[-1] > indicator_lows.iloc[-2]):
+        if (last_p.min() < prev_p.min() and
+            last_ind.min() > prev_ind.min()):
             return "BEARISH_DIVERGENCE"
         
         return "NO_DIVERGENCE"
@@ -118,35 +155,25 @@ def calculate_advanced_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """
     Aplica indicadores avançados ao DataFrame
     """
-    df = df.copy()
-    advanced = AdvancedTechnicalIndicators()
-    
-    support_resistance = []
-    market_strength = []
-    
-    for idx, row in df.iterrows():
-        try:
-            # Criar dados sintéticos para demonstração
-            prices = pd.Series([row['current_price'] * (1 + i * 0.01) 
-                              for i in range(-10, 10)])
-            highs = prices * 1.02
-            lows = prices * 0.98
-            
-            # Calcular suporte/resistência
-            sr_levels = advanced.calculate_support_resistance(highs, lows, prices)
-            support_resistance.append(sr_levels)
-            
-            # Calcular força do mercado
-            volume_data = pd.Series([row['total_volume']] * 20)
-            price_changes = pd.Series([row['price_change_percentage_24h'] / 100] * 20)
-            strength = advanced.calculate_market_strength(volume_data, price_changes)
-            market_strength.append(strength)
-            
-        except Exception:
-            support_resistance.append({})
-            market_strength.append(50)
-    
-    df['support_resistance'] = support_resistance
-    df['market_strength'] = market_strength
-    
+    # Cópia rasa: só novas colunas são atribuídas, os dados não são duplicados
+    df = df.copy(deep=False)
+
+    if 'current_price' not in df.columns or 'price_change_percentage_24h' not in df.columns:
+        df[list(SR_LEVELS)] = np.nan
+        df['market_strength'] = 50
+        return df
+
+    prices = df['current_price'].to_numpy(dtype=float)
+    price_changes = df['price_change_percentage_24h'].to_numpy(dtype=float) / 100
+
+    # Pivot points são múltiplos fixos do preço atual
+    levels = _sr_levels_from_price(prices)
+
+    # Volume sintético é constante => pct_change médio é 0,
+    # então a força depende apenas da variação 24h
+    strength = _market_strength_score(0, price_changes)
+
+    df[list(SR_LEVELS)] = levels
+    df['market_strength'] = np.clip(np.nan_to_num(strength, nan=50), 0, 100)
+
     return df
\ No newline at end of file
@@ -1,10 +1,101 @@
 import pandas as pd
 import numpy as np
-import streamlit as st
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 import requests
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import os
 import time
+import logging
+import threading
+from numpy.lib.stride_tricks import sliding_window_view
+from data.config import MA
+from utils._njit import njit, prange, NUMBA_AVAILABLE, PARALLEL_LOCK
+from utils.http_session import create_http_session, get_history, get_shared_session
+
+logger = logging.getLogger(__name__)
+
+# Requisições simultâneas ao buscar histórico das moedas
+MA_MAX_WORKERS = 8
+
+# Cache em disco do histórico (L2): um arquivo parquet por moeda e dia UTC,
+# só com os candles de dias já fechados
+HIST_CACHE_DIR = Path("cache") / "hist_4h"
+
+def _utc_midnight() -> pd.Timestamp:
+    """Início do dia UTC atual (naive, como os timestamps do histórico)"""
+    return pd.Timestamp(datetime.now(timezone.utc).date())
+
+def _hist_cache_path(coin_id: str) -> Path:
+    """Caminho do parquet do histórico da moeda para o dia UTC atual"""
+    today_utc = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    return HIST_CACHE_DIR / f"{coin_id}_{today_utc}.parquet"
+
+def _remove_old_hist_cache(coin_id: str, keep: Path) -> None:
+    """Apaga os arquivos de dias anteriores da moeda (falhas são ignoradas)"""
+    for path in HIST_CACHE_DIR.glob(f"{coin_id}_*.parquet"):
+        # rsplit evita apagar arquivos de outra moeda com o mesmo prefixo
+        if path != keep and path.stem.rsplit('_', 1)[0] == coin_id:
+            path.unlink(missing_ok=True)
+
+def _read_hist_cache(coin_id: str) -> Optional[pd.DataFrame]:
+    """Lê histórico do disco; None se não existir ou não puder ser lido"""
+    path = _hist_cache_path(coin_id)
+    if not path.exists():
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except Exception:
+        # Sem engine parquet (pyarrow) ou arquivo corrompido: buscar na API
+        return None
+    return df if not df.empty else None
+
+def _write_hist_cache(coin_id: str, df: pd.DataFrame) -> None:
+    """Grava histórico no disco; falhas são ignoradas (cache é opcional)"""
+    path = _hist_cache_path(coin_id)
+    tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(tmp_path)
+        # Troca atômica: leitores concorrentes nunca veem arquivo parcial
+        os.replace(tmp_path, path)
+        _remove_old_hist_cache(coin_id, path)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+
+def _prices_frame(data: Optional[Dict]) -> pd.DataFrame:
+    """Preços do market_chart da CoinGecko indexados por timestamp"""
+    prices = data.get('prices', []) if data else []
+    if not prices:
+        return pd.DataFrame()
+    
+    df = pd.DataFrame(prices, columns=['timestamp', 'price'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df.set_index('timestamp')
+
+def _with_latest_price(closed: pd.DataFrame, coin_id: str, http: requests.Session) -> pd.DataFrame:
+    """
+    Completa o histórico de dias fechados (disco) com o preço mais recente
+    
+    O ponto do dia corrente muda ao longo do dia, então não vai para o disco:
+    busca só o último dia e acrescenta o ponto mais novo. Se a busca falhar,
+    devolve os dias fechados.
+    """
+    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
+    params = {'vs_currency': 'usd', 'days': 1, 'interval': 'daily'}
+    try:
+        response = get_history(http, url, coin_id, params=params, timeout=15)
+        response.raise_for_status()
+        latest = _prices_frame(response.json())
+    except Exception as e:
+        logger.warning("Erro ao atualizar último preço de %s: %s", coin_id, str(e)[:100])
+        return closed
+    
+    latest = latest[latest.index > closed.index[-1]]
+    if latest.empty:
+        return closed
+    return pd.concat([closed, latest.iloc[-1:]])
 
 def calculate_ema(prices: pd.Series, period: int) -> pd.Series:
     """Calcula Média Móvel Exponencial (EMA)"""
@@ -14,14 +105,48 @@ def calculate_sma(prices: pd.Series, period: int) -> pd.Series:
     """Calcula Média Móvel Simples (SMA)"""
     return prices.rolling(window=period).mean()
 
-@st.cache_data(ttl=600)
-def get_historical_data_4h(coin_id: str, queue_manager=None) -> pd.DataFrame:
+# Cache em memória do histórico por moeda: {coin_id: (timestamp, DataFrame)}
+HIST_MEMORY_TTL = 600
+_hist_memory_cache: Dict[str, Tuple[float, pd.DataFrame]] = {}
+_hist_memory_lock = threading.Lock()
+
+def get_historical_data_4h(coin_id: str, queue_manager=None,
+                           session: Optional[requests.Session] = None) -> pd.DataFrame:
+    """
+    Obtém dados históricos com cache em memória de HIST_MEMORY_TTL segundos
+    
+    Args:
+        coin_id: ID da moeda
+        queue_manager: Gerenciador de fila (opcional)
+        session: Sessão HTTP reutilizável (opcional)
+    
+    Returns:
+        DataFrame com dados históricos
+    """
+    now = time.time()
+    with _hist_memory_lock:
+        cached = _hist_memory_cache.get(coin_id)
+    if cached is not None and now - cached[0] < HIST_MEMORY_TTL:
+        return cached[1]
+    
+    df = _get_historical_data_4h_uncached(coin_id, queue_manager, session)
+    
+    # Falhas não são cacheadas para permitir nova tentativa
+    if not df.empty:
+        with _hist_memory_lock:
+            _hist_memory_cache[coin_id] = (now, df)
+    
+    return df
+
+def _get_historical_data_4h_uncached(coin_id: str, queue_manager=None,
+                                     session: Optional[requests.Session] = None) -> pd.DataFrame:
     """
     Obtém dados históricos da CoinGecko com suporte a queue manager
     
     Args:
         coin_id: ID da moeda
         queue_manager: Gerenciador de fila (opcional)
+        session: Sessão HTTP reutilizável (opcional)
     
     Returns:
         DataFrame com dados históricos
@@ -34,6 +159,16 @@ def get_historical_data_4h(coin_id: str, queue_manager=None) -> pd.DataFrame:
         if cached is not None and not cached.empty:
             return cached
     
+    http = session if session is not None else get_shared_session()
+    
+    # Dias fechados já buscados hoje estão em disco: falta só o preço atual
+    cached = _read_hist_cache(coin_id)
+    if cached is not None:
+        df = _with_latest_price(cached, coin_id, http)
+        if queue_manager:
+            queue_manager.set_cache(cache_key, df)
+        return df
+    
     try:
         url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
         params = {
@@ -45,204 +180,439 @@ def get_historical_data_4h(coin_id: str, queue_manager=None) -> pd.DataFrame:
         # Usar queue manager se disponível
         if queue_manager:
             def fetch_data():
-                response = requests.get(url, params=params, timeout=15)
+                response = get_history(http, url, coin_id, params=params, timeout=15)
                 response.raise_for_status()
                 return response.json()
             
             data = queue_manager.execute_with_retry(fetch_data, cache_key, max_retries=2)
         else:
-            response = requests.get(url, params=params, timeout=15)
+            response = get_history(http, url, coin_id, params=params, timeout=15)
             response.raise_for_status()
             data = response.json()
         
-        if data is None or 'prices' not in data:
-            return pd.DataFrame()
-        
-        prices = data.get('prices', [])
-        if not prices:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(prices, columns=['timestamp', 'price'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
+        df = _prices_frame(data)
         
         # Cachear se tem queue manager
         if queue_manager and not df.empty:
             queue_manager.set_cache(cache_key, df)
         
+        # Pontos depois da meia-noite UTC ainda mudam ao longo do dia: ficam fora do disco
+        closed = df[df.index <= _utc_midnight()]
+        if not closed.empty:
+            _write_hist_cache(coin_id, closed)
+        
         return df
         
     except Exception as e:
-        st.warning(f"⚠️ Erro ao obter dados para {coin_id}: {str(e)[:100]}")
+        logger.warning("Erro ao obter dados para %s: %s", coin_id, str(e)[:100])
         return pd.DataFrame()
 
+# Duração de um candle de 4h em nanossegundos
+CANDLE_4H_NS = 4 * 3600 * 1_000_000_000
+
 def resample_to_4h(df: pd.DataFrame) -> pd.DataFrame:
     """Realiza resample dos dados para 4h"""
     if df.empty:
         return pd.DataFrame()
     
     try:
-        four_hourly = df['price'].resample('4H').ohlc()
-        four_hourly['volume'] = df['price'].resample('4H').count()
-        four_hourly = four_hourly.dropna()
+        price = df['price'].to_numpy(dtype=np.float64)
+        ts = df.index.as_unit('ns').asi8
+        
+        # Preços ausentes não formam candle
+        valid = ~np.isnan(price)
+        price, ts = price[valid], ts[valid]
+        if price.size == 0:
+            return pd.DataFrame()
+        
+        if np.any(ts[1:] < ts[:-1]):
+            order = np.argsort(ts, kind='stable')
+            price, ts = price[order], ts[order]
+        
+        # Candles de 4h alinhados à meia-noite UTC: divisão inteira do epoch
+        bucket = ts // CANDLE_4H_NS
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        ends = np.r_[starts[1:], price.size]
+        
+        four_hourly = pd.DataFrame({
+            'open': price[starts],
+            'high': np.maximum.reduceat(price, starts),
+            'low': np.minimum.reduceat(price, starts),
+            'close': price[ends - 1],
+            'volume': ends - starts
+        }, index=pd.DatetimeIndex(bucket[starts] * CANDLE_4H_NS, name=df.index.name))
         return four_hourly
     except Exception as e:
         return pd.DataFrame()
 
+# Candles finais das médias usados na análise (3 de toque + inclinação de 5)
+MA_TAIL = max(5, MA.analysis_candles)
+
+# Candles recentes verificados para toque na média
+MA_TOUCH_CANDLES = MA.analysis_candles
+
+@njit(cache=True)
+def _sma_tail(close, period, n_tail):
+    """
+    Últimos `n_tail` valores da SMA, sem calcular a série inteira
+    Posições sem janela completa ficam como NaN
+    """
+    tail = np.full(n_tail, np.nan)
+
+    n = len(close)
+    for j in range(n_tail):
+        end = n - n_tail + 1 + j
+        start = end - period
+        if start < 0:
+            continue
+
+        total = 0.0
+        for i in range(start, end):
+            total += close[i]
+        tail[j] = total / period
+    return tail
+
+@njit(cache=True)
+def _ema_tail(close, period, n_tail):
+    """
+    Últimos `n_tail` valores da EMA (adjust=False, semente no primeiro preço)
+    A recursão percorre a série toda, mas só a cauda é alocada
+    """
+    alpha = 2.0 / (period + 1)
+    tail = np.full(n_tail, np.nan)
+
+    n = len(close)
+    start = n - n_tail
+    ema = close[0]
+    for i in range(n):
+        if i > 0:
+            ema = (1 - alpha) * ema + alpha * close[i]
+        if i >= start:
+            tail[i - start] = ema
+    return tail
+
+# Códigos retornados por _touch_scan
+TOUCH_TYPES = ("NENHUM", "COMPRA", "VENDA")
+
+@njit(cache=True)
+def _touch_scan(high, low, close, ma, n_last):
+    """
+    Verifica toque da média nos últimos `n_last` candles
+
+    Returns:
+        Tuple (tocou, código do tipo do último toque, força máxima do toque)
+    """
+    touched = False
+    type_code = 0
+    strength = 0.0
+
+    n = len(close)
+    for i in range(max(n - n_last, 0), n):
+        ma_val = ma[i]
+        if np.isnan(ma_val):
+            continue
+
+        if low[i] <= ma_val <= high[i]:
+            touched = True
+
+            # Força baseada em quão acima/abaixo da média fechou
+            if close[i] > ma_val:
+                type_code = 1
+                strength = max(strength, ((close[i] - ma_val) / ma_val) * 100)
+            else:
+                type_code = 2
+                strength = max(strength, ((ma_val - close[i]) / ma_val) * 100)
+
+    return touched, type_code, strength
+
+@njit(parallel=True, cache=True)
+def _batch_ma_kernel(high, low, close, lengths, periods, n_tail, n_last):
+    """
+    SMA/EMA finais e toques de várias moedas em uma única passada
+
+    Cada linha das matrizes (moedas x candles) tem `lengths[r]` candles
+    válidos alinhados à esquerda; o restante é preenchimento NaN.
+
+    Returns:
+        Tuple (caudas SMA, caudas EMA, tocou, código do tipo, força),
+        com a última dimensão [SMA, EMA] nos três últimos
+    """
+    k = close.shape[0]
+    sma = np.full((k, n_tail), np.nan)
+    ema = np.full((k, n_tail), np.nan)
+    touched = np.zeros((k, 2), dtype=np.bool_)
+    type_codes = np.zeros((k, 2), dtype=np.int64)
+    strengths = np.zeros((k, 2))
+
+    for r in prange(k):
+        n = lengths[r]
+        c = close[r, :n]
+        sma[r] = _sma_tail(c, periods[r], n_tail)
+        ema[r] = _ema_tail(c, periods[r], n_tail)
+
+        h_tail = high[r, n - n_tail:n]
+        l_tail = low[r, n - n_tail:n]
+        c_tail = close[r, n - n_tail:n]
+        for m in range(2):
+            ma = sma[r] if m == 0 else ema[r]
+            t, code, s = _touch_scan(h_tail, l_tail, c_tail, ma, n_last)
+            touched[r, m] = t
+            type_codes[r, m] = code
+            strengths[r, m] = s
+
+    return sma, ema, touched, type_codes, strengths
+
+def _batch_ma_numpy(high, low, close, lengths, periods, n_tail, n_last):
+    """
+    Versão NumPy de _batch_ma_kernel, usada quando o numba não está instalado
+
+    As médias são calculadas por moeda em operações vetorizadas e os toques
+    de todas as moedas são verificados de uma vez sobre os candles finais.
+    """
+    k = close.shape[0]
+    sma = np.full((k, n_tail), np.nan)
+    ema = np.full((k, n_tail), np.nan)
+
+    for r in range(k):
+        c = close[r, :lengths[r]]
+        period = periods[r]
+
+        # Janelas das últimas posições, somadas em sequência como no kernel
+        windows = sliding_window_view(c, period)[-n_tail:]
+        sma[r, n_tail - len(windows):] = windows.cumsum(axis=1)[:, -1] / period
+        ema[r] = pd.Series(c).ewm(span=period, adjust=False).mean().to_numpy()[-n_tail:]
+
+    # Últimos `n_last` candles de cada moeda contra SMA e EMA: (moedas x 2 x n_last)
+    cols = lengths[:, None] - n_last + np.arange(n_last)
+    rows = np.arange(k)[:, None]
+    h = high[rows, cols][:, None, :]
+    l = low[rows, cols][:, None, :]
+    c = close[rows, cols][:, None, :]
+    ma = np.stack([sma, ema], axis=1)[:, :, -n_last:]
+
+    # Comparações com NaN são falsas: posições sem média não contam como toque
+    hit = (l <= ma) & (ma <= h)
+    touched = hit.any(axis=2)
+
+    # Tipo do último toque: fechamento acima da média é COMPRA
+    last_hit = n_last - 1 - np.argmax(hit[:, :, ::-1], axis=2)
+    above = np.take_along_axis(c > ma, last_hit[..., None], axis=2)[..., 0]
+    type_codes = np.where(touched, np.where(above, 1, 2), 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        strengths = np.where(hit, np.abs(c - ma) / ma * 100, 0.0).max(axis=2)
+
+    return sma, ema, touched, type_codes, strengths
+
+def _ma_touch_result(sma_200: np.ndarray, ema_200: np.ndarray, touched: np.ndarray,
+                     type_codes: np.ndarray, strengths: np.ndarray,
+                     current_price: float, period: int, data_points: int) -> Dict:
+    """Monta o dict de análise 4h a partir da saída do kernel para uma moeda"""
+    # Últimos valores
+    last_sma = sma_200[-1]
+    last_ema = ema_200[-1]
+
+    # Aritmética em escalares float64: MA zerada vira inf/nan sem aviso
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Distâncias percentuais
+        distance_to_sma = ((current_price - last_sma) / last_sma) * 100
+        distance_to_ema = ((current_price - last_ema) / last_ema) * 100
+
+        # Inclinação das MAs (últimos 5 períodos)
+        if sma_200.size >= 5:
+            sma_slope = (last_sma - sma_200[-5]) / sma_200[-5] * 100
+            ema_slope = (last_ema - ema_200[-5]) / ema_200[-5] * 100
+        else:
+            sma_slope = 0
+            ema_slope = 0
+
+    # Tendência
+    trend_sma = "ALTA" if current_price > last_sma else "BAIXA"
+    trend_ema = "ALTA" if current_price > last_ema else "BAIXA"
+
+    # Verificar se está próximo (dentro de 2%)
+    near_sma = abs(distance_to_sma) < 2
+    near_ema = abs(distance_to_ema) < 2
+
+    return {
+        'timeframe': '4h',
+        'sma_200': last_sma,
+        'ema_200': last_ema,
+        'touched_sma': bool(touched[0]),
+        'touched_ema': bool(touched[1]),
+        'touch_type_sma': TOUCH_TYPES[type_codes[0]],
+        'touch_type_ema': TOUCH_TYPES[type_codes[1]],
+        'touch_strength_sma': round(float(strengths[0]), 2),
+        'touch_strength_ema': round(float(strengths[1]), 2),
+        'near_sma': near_sma,
+        'near_ema': near_ema,
+        'distance_sma_pct': round(distance_to_sma, 2),
+        'distance_ema_pct': round(distance_to_ema, 2),
+        'trend_sma': trend_sma,
+        'trend_ema': trend_ema,
+        'sma_slope': round(sma_slope, 2),
+        'ema_slope': round(ema_slope, 2),
+        'periods_used': period,
+        'data_points': data_points
+    }
+
+def analyze_ma_touch_4h_batch(datasets: List[pd.DataFrame],
+                              current_prices: List[float]) -> List[Dict]:
+    """
+    Analisa toque na MA 200 de 4h de várias moedas com um único kernel
+
+    Args:
+        datasets: DataFrames com dados OHLC de 4h (um por moeda)
+        current_prices: Preço atual de cada moeda
+
+    Returns:
+        Lista de dicts de análise (vazio para moedas sem dados suficientes)
+    """
+    results = [{} for _ in datasets]
+
+    # Período baseado nos dados disponíveis (mínimo de 50 candles)
+    rows = [i for i, data in enumerate(datasets)
+            if not data.empty and min(MA.period, len(data) - 1) >= 50]
+    if not rows:
+        return results
+
+    lengths = np.array([len(datasets[i]) for i in rows], dtype=np.int64)
+    periods = np.minimum(MA.period, lengths - 1)
+
+    # Matrizes moedas x candles, preenchidas com NaN após o último candle
+    shape = (len(rows), int(lengths.max()))
+    high = np.full(shape, np.nan)
+    low = np.full(shape, np.nan)
+    close = np.full(shape, np.nan)
+    for r, i in enumerate(rows):
+        n = lengths[r]
+        high[r, :n] = datasets[i]['high'].to_numpy(dtype=np.float64)
+        low[r, :n] = datasets[i]['low'].to_numpy(dtype=np.float64)
+        close[r, :n] = datasets[i]['close'].to_numpy(dtype=np.float64)
+
+    if NUMBA_AVAILABLE:
+        with PARALLEL_LOCK:
+            sma, ema, touched, type_codes, strengths = _batch_ma_kernel(
+                high, low, close, lengths, periods, MA_TAIL, MA_TOUCH_CANDLES)
+    else:
+        sma, ema, touched, type_codes, strengths = _batch_ma_numpy(
+            high, low, close, lengths, periods, MA_TAIL, MA_TOUCH_CANDLES)
+
+    for r, i in enumerate(rows):
+        results[i] = _ma_touch_result(sma[r], ema[r], touched[r], type_codes[r],
+                                      strengths[r], current_prices[i],
+                                      int(periods[r]), int(lengths[r]))
+    return results
+
 def analyze_ma_touch_4h(data: pd.DataFrame, current_price: float) -> Dict:
     """
     Analisa se o preço tocou a MA 200 no gráfico de 4h
-    
+
     Args:
         data: DataFrame com dados OHLC de 4h
         current_price: Preço atual
-    
+
     Returns:
         Dict com análise detalhada
     """
     if data.empty or len(data) < 50:
         return {}
-    
+
     try:
-        close_prices = data['close']
-        high_prices = data['high']
-        low_prices = data['low']
-        
-        # Calcular período baseado nos dados disponíveis
-        period = min(200, len(close_prices) - 1)
-        if period < 50:
-            return {}
-        
-        # Calcular médias móveis
-        sma_200 = calculate_sma(close_prices, period)
-        ema_200 = calculate_ema(close_prices, period)
-        
-        # Últimos valores
-        last_sma = sma_200.iloc[-1] if not sma_200.empty else None
-        last_ema = ema_200.iloc[-1] if not ema_200.empty else None
-        
-        if last_sma is None or last_ema is None:
-            return {}
-        
-        # Verificar toque nas médias nos últimos 3 candles
-        recent_touches_sma = False
-        recent_touches_ema = False
-        touch_type_sma = "NENHUM"
-        touch_type_ema = "NENHUM"
-        touch_strength_sma = 0
-        touch_strength_ema = 0
-        
-        # Analisar últimos 3 candles
-        for i in range(max(-3, -len(data)), 0):
-            high = high_prices.iloc[i]
-            low = low_prices.iloc[i]
-            close = data['close'].iloc[i]
-            
-            # SMA Touch Analysis
-            if not pd.isna(sma_200.iloc[i]):
-                sma_val = sma_200.iloc[i]
-                if low <= sma_val <= high:
-                    recent_touches_sma = True
-                    
-                    # Determinar tipo de toque
-                    if close > sma_val:
-                        touch_type_sma = "COMPRA"
-                        # Força baseada em quão acima fechou
-                        touch_strength_sma = max(touch_strength_sma, 
-                                                 ((close - sma_val) / sma_val) * 100)
-                    else:
-                        touch_type_sma = "VENDA"
-                        touch_strength_sma = max(touch_strength_sma,
-                                                ((sma_val - close) / sma_val) * 100)
-            
-            # EMA Touch Analysis
-            if not pd.isna(ema_200.iloc[i]):
-                ema_val = ema_200.iloc[i]
-                if low <= ema_val <= high:
-                    recent_touches_ema = True
-                    
-                    if close > ema_val:
-                        touch_type_ema = "COMPRA"
-                        touch_strength_ema = max(touch_strength_ema,
-                                                ((close - ema_val) / ema_val) * 100)
-                    else:
-                        touch_type_ema = "VENDA"
-                        touch_strength_ema = max(touch_strength_ema,
-                                                ((ema_val - close) / ema_val) * 100)
-        
-        # Distâncias percentuais
-        distance_to_sma = ((current_price - last_sma) / last_sma) * 100
-        distance_to_ema = ((current_price - last_ema) / last_ema) * 100
-        
-        # Tendência
-        trend_sma = "ALTA" if current_price > last_sma else "BAIXA"
-        trend_ema = "ALTA" if current_price > last_ema else "BAIXA"
-        
-        # Verificar se está próximo (dentro de 2%)
-        near_sma = abs(distance_to_sma) < 2
-        near_ema = abs(distance_to_ema) < 2
-        
-        # Inclinação das MAs (últimos 5 períodos)
-        if len(sma_200) >= 5:
-            sma_slope = (sma_200.iloc[-1] - sma_200.iloc[-5]) / sma_200.iloc[-5] * 100
-            ema_slope = (ema_200.iloc[-1] - ema_200.iloc[-5]) / ema_200.iloc[-5] * 100
-        else:
-            sma_slope = 0
-            ema_slope = 0
-        
-        return {
-            'timeframe': '4h',
-            'sma_200': last_sma,
-            'ema_200': last_ema,
-            'touched_sma': recent_touches_sma,
-            'touched_ema': recent_touches_ema,
-            'touch_type_sma': touch_type_sma,
-            'touch_type_ema': touch_type_ema,
-            'touch_strength_sma': round(touch_strength_sma, 2),
-            'touch_strength_ema': round(touch_strength_ema, 2),
-            'near_sma': near_sma,
-            'near_ema': near_ema,
-            'distance_sma_pct': round(distance_to_sma, 2),
-            'distance_ema_pct': round(distance_to_ema, 2),
-            'trend_sma': trend_sma,
-            'trend_ema': trend_ema,
-            'sma_slope': round(sma_slope, 2),
-            'ema_slope': round(ema_slope, 2),
-            'periods_used': period,
-            'data_points': len(data)
-        }
-        
+        return analyze_ma_touch_4h_batch([data], [current_price])[0]
+
     except Exception as e:
-        st.warning(f"Erro na análise de MA 4h: {e}")
+        logger.warning("Erro na análise de MA 4h: %s", e)
         return {}
 
-def multi_timeframe_ma_analysis(coin_id: str, current_price: float, 
-                                queue_manager=None) -> Dict[str, Dict]:
+def fetch_data_4h(coin_id: str, queue_manager=None,
+                  session: Optional[requests.Session] = None) -> pd.DataFrame:
+    """
+    Busca o histórico da moeda e converte para candles de 4h
+
+    Args:
+        coin_id: ID da moeda
+        queue_manager: Gerenciador de fila (opcional)
+        session: Sessão HTTP reutilizável (opcional)
+
+    Returns:
+        DataFrame OHLC de 4h (vazio se não houver dados)
+    """
+    historical_data = get_historical_data_4h(coin_id, queue_manager, session)
+
+    if historical_data.empty:
+        return pd.DataFrame()
+
+    return resample_to_4h(historical_data)
+
+def multi_timeframe_ma_analysis(coin_id: str, current_price: float,
+                                queue_manager=None,
+                                session: Optional[requests.Session] = None) -> Dict[str, Dict]:
     """
     Realiza análise de médias móveis focada em 4h
-    
+
     Args:
         coin_id: ID da moeda
         current_price: Preço atual
         queue_manager: Gerenciador de fila (opcional)
-    
+        session: Sessão HTTP reutilizável (opcional)
+
     Returns:
         Dict com análise de 4h
     """
-    historical_data = get_historical_data_4h(coin_id, queue_manager)
-    
-    if historical_data.empty:
-        return {'4h': {}}
-    
-    data_4h = resample_to_4h(historical_data)
-    
+    data_4h = fetch_data_4h(coin_id, queue_manager, session)
+
     if data_4h.empty:
         return {'4h': {}}
-    
+
     analysis_4h = analyze_ma_touch_4h(data_4h, current_price)
-    
+
     return {'4h': analysis_4h}
 
+# Códigos de tendência usados na tabela de sinais (0 = neutro)
+_TREND_CODES = {"ALTA": 1, "BAIXA": 2}
+_TOUCH_CODES = {name: code for code, name in enumerate(TOUCH_TYPES)}
+
+def _resolve_ma_signal(sma_code: int, ema_code: int, near: bool,
+                       trend_code: int) -> Tuple[str, int, int]:
+    """
+    Regra de decisão do sinal de MA (usada apenas para montar _SIGNAL_LUT)
+
+    Returns:
+        Tuple (sinal, ajuste do score, sentido da inclinação que reforça o sinal)
+    """
+    if sma_code == 1:
+        return "🟢 FORTE COMPRA", 40, 1
+    elif ema_code == 1:
+        return "🟢 COMPRA", 30, 0
+    elif near and trend_code == 1:
+        return "🟢 COMPRA PRÓXIMA", 20, 0
+    elif sma_code == 2:
+        return "🔴 FORTE VENDA", -40, -1
+    elif ema_code == 2:
+        return "🔴 VENDA", -30, 0
+    elif near and trend_code == 2:
+        return "🔴 VENDA PRÓXIMA", -20, 0
+    elif trend_code == 1:
+        return "⬆️ TENDÊNCIA ALTA", 10, 0
+    elif trend_code == 2:
+        return "⬇️ TENDÊNCIA BAIXA", -10, 0
+    return "⚪ NEUTRO", 0, 0
+
+def _signal_key(sma_code: int, ema_code: int, near: bool, trend_code: int) -> int:
+    """Índice na tabela de sinais (3 x 3 x 2 x 3 combinações)"""
+    return ((sma_code * 3 + ema_code) * 2 + near) * 3 + trend_code
+
+# Tabela pré-calculada com todas as combinações de toque/proximidade/tendência
+_SIGNAL_LUT = [None] * 54
+for _sma in range(3):
+    for _ema in range(3):
+        for _near in (False, True):
+            for _trend in range(3):
+                _SIGNAL_LUT[_signal_key(_sma, _ema, _near, _trend)] = \
+                    _resolve_ma_signal(_sma, _ema, _near, _trend)
+del _sma, _ema, _near, _trend
+
 def generate_ma_signal(ma_analysis: Dict[str, Dict]) -> Tuple[str, int]:
     """
     Gera sinal consolidado baseado na análise de MA 4h
@@ -273,40 +643,20 @@ def generate_ma_signal(ma_analysis: Dict[str, Dict]) -> Tuple[str, int]:
     trend_sma = analysis.get('trend_sma', 'NEUTRO')
     sma_slope = analysis.get('sma_slope', 0)
     
+    # Toque só conta com o tipo registrado (0 = sem toque)
+    sma_code = _TOUCH_CODES.get(touch_type_sma, 0) if touched_sma else 0
+    ema_code = _TOUCH_CODES.get(touch_type_ema, 0) if touched_ema else 0
+    trend_code = _TREND_CODES.get(trend_sma, 0)
+    
+    signal, delta, slope_dir = _SIGNAL_LUT[
+        _signal_key(sma_code, ema_code, bool(near_sma or near_ema), trend_code)]
+    
     # Score inicial
-    score = 50
-    
-    # Análise de toque
-    if touched_sma and touch_type_sma == "COMPRA":
-        score += 40
-        if sma_slope > 0:  # MA subindo
-            score += 10
-        signal = "🟢 FORTE COMPRA"
-    elif touched_ema and touch_type_ema == "COMPRA":
-        score += 30
-        signal = "🟢 COMPRA"
-    elif (near_sma or near_ema) and trend_sma == "ALTA":
-        score += 20
-        signal = "🟢 COMPRA PRÓXIMA"
-    elif touched_sma and touch_type_sma == "VENDA":
-        score -= 40
-        if sma_slope < 0:  # MA descendo
-            score -= 10
-        signal = "🔴 FORTE VENDA"
-    elif touched_ema and touch_type_ema == "VENDA":
-        score -= 30
-        signal = "🔴 VENDA"
-    elif (near_sma or near_ema) and trend_sma == "BAIXA":
-        score -= 20
-        signal = "🔴 VENDA PRÓXIMA"
-    elif trend_sma == "ALTA":
-        score += 10
-        signal = "⬆️ TENDÊNCIA ALTA"
-    elif trend_sma == "BAIXA":
-        score -= 10
-        signal = "⬇️ TENDÊNCIA BAIXA"
-    else:
-        signal = "⚪ NEUTRO"
+    score = 50 + delta
+    
+    # Inclinação da SMA no sentido do sinal reforça o toque forte
+    if slope_dir * sma_slope > 0:
+        score += 10 * slope_dir
     
     # Ajustar score baseado na força do toque
     if touched_sma:
@@ -319,7 +669,9 @@ def generate_ma_signal(ma_analysis: Dict[str, Dict]) -> Tuple[str, int]:
     
     return signal, int(score)
 
-def calculate_ma_indicators(df: pd.DataFrame, queue_manager=None) -> pd.DataFrame:
+def calculate_ma_indicators(df: pd.DataFrame, queue_manager=None,
+                            progress_callback: Optional[Callable[[int, int], None]] = None
+                            ) -> pd.DataFrame:
     """
     Aplica análise de médias móveis 4h com suporte a queue manager
     Analisa apenas top 15 para otimizar requisições
@@ -327,58 +679,70 @@ def calculate_ma_indicators(df: pd.DataFrame, queue_manager=None) -> pd.DataFram
     Args:
         df: DataFrame com dados das moedas
         queue_manager: Gerenciador de fila (opcional)
+        progress_callback: Chamado com (concluídas, total) durante as buscas (opcional)
     
     Returns:
         DataFrame com indicadores MA adicionados
     """
-    df = df.copy()
-    
-    ma_signals = []
-    ma_strengths = []
-    ma_details = []
+    # Cópia rasa: só novas colunas são atribuídas, os dados não são duplicados
+    df = df.copy(deep=False)
     
     # Limitar para as top 15 moedas
     limited_df = df.head(15) if len(df) > 15 else df
     
     total_coins = len(limited_df)
     
-    # Criar progress bar se não estiver em queue
-    progress_text = st.empty()
+    ma_signals = ["DADOS INSUFICIENTES"] * total_coins
+    ma_strengths = [0] * total_coins
+    ma_details = [{} for _ in range(total_coins)]
     
-    for idx, (_, row) in enumerate(limited_df.iterrows(), 1):
-        coin_id = row.get('id', '') or row.get('coin_id', '')
-        current_price = row.get('current_price', 0)
+    # Extrair colunas uma vez em vez de montar uma Series por linha
+    missing = [''] * total_coins
+    ids = limited_df['id'].tolist() if 'id' in limited_df.columns else missing
+    alt_ids = limited_df['coin_id'].tolist() if 'coin_id' in limited_df.columns else missing
+    prices = (limited_df['current_price'].tolist()
+              if 'current_price' in limited_df.columns else [0] * total_coins)
+
+    # Buscar históricos em paralelo reaproveitando conexões HTTP
+    with create_http_session() as session, \
+            ThreadPoolExecutor(max_workers=MA_MAX_WORKERS) as executor:
+        futures = {}
+        for idx, (coin_id, alt_id, current_price) in enumerate(zip(ids, alt_ids, prices)):
+            coin_id = coin_id or alt_id
+
+            if coin_id and current_price > 0:
+                future = executor.submit(fetch_data_4h, coin_id, queue_manager, session)
+                futures[future] = idx
         
-        if coin_id and current_price > 0:
+        data_4h = {}
+        for done, future in enumerate(as_completed(futures), 1):
             # Mostrar progresso
-            if idx % 3 == 0:
-                progress_text.text(f"📊 Analisando MA: {idx}/{total_coins} moedas...")
-            
-            # Análise multi-timeframe (apenas 4h)
-            ma_analysis = multi_timeframe_ma_analysis(coin_id, current_price, queue_manager)
+            if progress_callback and done % 3 == 0:
+                progress_callback(done, len(futures))
             
-            # Gerar sinal consolidado
-            signal, strength = generate_ma_signal(ma_analysis)
-            
-            ma_signals.append(signal)
-            ma_strengths.append(strength)
-            ma_details.append(ma_analysis)
-            
-            # Pequeno delay se não estiver usando queue manager
-            if queue_manager is None:
-                time.sleep(0.5)
-        else:
-            ma_signals.append("DADOS INSUFICIENTES")
-            ma_strengths.append(0)
-            ma_details.append({})
+            data_4h[futures[future]] = future.result()
     
-    progress_text.empty()
+    # Médias e toques de todas as moedas em uma única chamada do kernel
+    analyzed = sorted(data_4h)
+    analyses = analyze_ma_touch_4h_batch([data_4h[idx] for idx in analyzed],
+                                         [prices[idx] for idx in analyzed])
+    
+    for idx, analysis_4h in zip(analyzed, analyses):
+        # Análise multi-timeframe (apenas 4h)
+        ma_analysis = {'4h': analysis_4h}
+        
+        # Gerar sinal consolidado
+        signal, strength = generate_ma_signal(ma_analysis)
+        
+        ma_signals[idx] = signal
+        ma_strengths[idx] = strength
+        ma_details[idx] = ma_analysis
     
     # Preencher o restante com valores padrão
-    for i in range(len(limited_df), len(df)):
-        ma_signals.append("NÃO ANALISADO")
-        ma_strengths.append(0)
-        ma_details.append({})
+    remaining = len(df) - len(limited_df)
+    ma_signals.extend(["NÃO ANALISADO"] * remaining)
+    ma_strengths.extend([0] * remaining)
+    ma_details.extend({} for _ in range(remaining))
     
     df['ma_signal'] = ma_signals
     df['ma_strength'] = ma_strengths
@@ -428,6 +792,17 @@ def format_ma_analysis_for_display(ma_analysis: Dict) -> str:
     
     return f"SMA:{touch_sma} EMA:{touch_ema} {trend} {touch_type} {near_symbol} ({dist_sma:+.1f}%) {slope_emoji}"
 
+# Categoria de cada sinal gerado por generate_ma_signal
+MA_SIGNAL_BUCKETS = {
+    "🟢 FORTE COMPRA": 'strong_buy',
+    "🟢 COMPRA": 'buy',
+    "🟢 COMPRA PRÓXIMA": 'buy',
+    "⚪ NEUTRO": 'neutral',
+    "🔴 VENDA": 'sell',
+    "🔴 VENDA PRÓXIMA": 'sell',
+    "🔴 FORTE VENDA": 'strong_sell'
+}
+
 def get_ma_statistics(df: pd.DataFrame) -> Dict:
     """
     Calcula estatísticas sobre análise de MA
@@ -446,13 +821,22 @@ def get_ma_statistics(df: pd.DataFrame) -> Dict:
     if len(analyzed) == 0:
         return {}
     
+    # Contar sinais por categoria em uma única passada
+    counts = analyzed['ma_signal'].map(MA_SIGNAL_BUCKETS).value_counts()
+
+    touched_count = sum(
+        bool(details.get('4h', {}).get('touched_sma', False) or
+             details.get('4h', {}).get('touched_ema', False))
+        for details in analyzed['ma_analysis']
+    )
+
     return {
         'total_analyzed': len(analyzed),
-        'strong_buy': len(analyzed[analyzed['ma_signal'].str.contains('FORTE COMPRA', na=False)]),
-        'buy': len(analyzed[analyzed['ma_signal'].str.contains('COMPRA', na=False)]) - len(analyzed[analyzed['ma_signal'].str.contains('FORTE COMPRA', na=False)]),
-        'neutral': len(analyzed[analyzed['ma_signal'].str.contains('NEUTRO', na=False)]),
-        'sell': len(analyzed[analyzed['ma_signal'].str.contains('VENDA', na=False)]) - len(analyzed[analyzed['ma_signal'].str.contains('FORTE VENDA', na=False)]),
-        'strong_sell': len(analyzed[analyzed['ma_signal'].str.contains('FORTE VENDA', na=False)]),
+        'strong_buy': int(counts.get('strong_buy', 0)),
+        'buy': int(counts.get('buy', 0)),
+        'neutral': int(counts.get('neutral', 0)),
+        'sell': int(counts.get('sell', 0)),
+        'strong_sell': int(counts.get('strong_sell', 0)),
         'avg_strength': analyzed['ma_strength'].mean(),
-        'touched_count': len(analyzed[analyzed['ma_analysis'].apply(lambda x: x.get('4h', {}).get('touched_sma', False) or x.get('4h', {}).get('touched_ema', False))])
+        'touched_count': touched_count
     }
\ No newline at end of file
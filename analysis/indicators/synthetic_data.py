@@ -0,0 +1,53 @@
+import numpy as np
+from functools import lru_cache
+from typing import Optional
+
+# Pontos da série sintética usada nos indicadores
+SYNTHETIC_POINTS = 30
+
+# Gerador (PCG64) compartilhado para o ruído das séries sintéticas
+_rng = np.random.default_rng()
+
+@lru_cache(maxsize=8)
+def _progress(n_points: int) -> np.ndarray:
+    """Fração percorrida da variação 24h em cada ponto da série"""
+    progress = np.arange(n_points) / n_points
+    progress.setflags(write=False)
+    return progress
+
+def synthetic_price_matrix(current_price: np.ndarray, price_change: np.ndarray,
+                           noise: float, n_points: int = SYNTHETIC_POINTS,
+                           rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Gera séries sintéticas de preço para todas as moedas de uma vez
+
+    Interpola linearmente a variação 24h a partir do preço de 24h atrás
+    e aplica ruído uniforme de ±`noise`.
+
+    Args:
+        current_price: Preço atual de cada moeda
+        price_change: Variação 24h (%) de cada moeda
+        noise: Amplitude relativa do ruído
+        n_points: Pontos por série
+        rng: Gerador de números aleatórios (opcional, padrão: gerador do módulo)
+
+    Returns:
+        Matriz (moedas x pontos) de preços estimados
+    """
+    current_price = np.asarray(current_price, dtype=float)
+    price_change = np.asarray(price_change, dtype=float)
+
+    # Invariantes por moeda calculados uma vez; a matriz é montada in-place
+    with np.errstate(divide='ignore', invalid='ignore'):
+        base_price = current_price / (1 + price_change / 100)
+        prices = np.multiply.outer(price_change, _progress(n_points))
+        prices /= 100
+        prices += 1
+        prices *= base_price[:, None]
+
+    # Ruído de todas as séries em uma única amostragem
+    rng = rng if rng is not None else _rng
+    noise_factor = rng.uniform(-noise, noise, size=prices.shape)
+    noise_factor += 1
+    prices *= noise_factor
+    return prices
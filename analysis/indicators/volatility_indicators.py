@@ -1,6 +1,36 @@
 import pandas as pd
 import numpy as np
+from functools import lru_cache
 import streamlit as st
+from analysis.indicators.synthetic_data import synthetic_price_matrix
+from data.config import VOLATILITY
+
+def calculate_atr_batch(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                        period: int = 14) -> np.ndarray:
+    """
+    Calcula ATR de várias séries de uma vez
+    
+    Args:
+        high, low, close: Matrizes de preços (séries x pontos)
+        period: Período do ATR
+    
+    Returns:
+        Array com o ATR final de cada série
+    """
+    close = np.asarray(close, dtype=float)
+    n_series, n_points = close.shape
+    
+    if n_points < period + 1:
+        return np.zeros(n_series)
+    
+    # True Range apenas dos `period` pontos finais (média usada no ATR)
+    h = np.asarray(high, dtype=float)[:, -period:]
+    l = np.asarray(low, dtype=float)[:, -period:]
+    prev_close = close[:, -period - 1:-1]
+    true_range = np.fmax.reduce([h - l, np.abs(h - prev_close), np.abs(l - prev_close)])
+    
+    atr = true_range.mean(axis=1)
+    return np.where(np.isnan(atr), 0.0, atr)
 
 def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> float:
     """
@@ -15,61 +45,67 @@ def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int
     Returns:
         Valor do ATR
     """
-    if len(close) < period + 1:
-        return 0.0
-    
-    # Calcular True Range
-    high_low = high - low
-    high_close = np.abs(high - close.shift())
-    low_close = np.abs(low - close.shift())
-    
-    true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-    
-    # Calcular ATR (média móvel do True Range)
-    atr = true_range.rolling(window=period).mean()
-    
-    return atr.iloc[-1] if not np.isnan(atr.iloc[-1]) else 0.0
+    atr = calculate_atr_batch(high.to_numpy(dtype=float)[None, :],
+                              low.to_numpy(dtype=float)[None, :],
+                              close.to_numpy(dtype=float)[None, :], period)
+    return atr[0]
 
-def calculate_bollinger_bands(prices: pd.Series, period: int = 20, std_dev: int = 2) -> dict:
+def calculate_bollinger_bands_batch(prices: np.ndarray, period: int = 20,
+                                    std_dev: int = 2) -> dict:
     """
-    Calcula Bandas de Bollinger
+    Calcula Bandas de Bollinger de várias séries de uma vez
     
     Args:
-        prices: Série de preços
+        prices: Matriz de preços (séries x pontos)
         period: Período da média móvel
         std_dev: Número de desvios padrão
     
     Returns:
-        Dict com upper_band, middle_band, lower_band
+        Dict com arrays upper, middle, lower e width (valor final de cada série)
     """
-    if len(prices) < period:
-        return {
-            'upper': prices.iloc[-1] if len(prices) > 0 else 0,
-            'middle': prices.iloc[-1] if len(prices) > 0 else 0,
-            'lower': prices.iloc[-1] if len(prices) > 0 else 0,
-            'width': 0
-        }
+    prices = np.asarray(prices, dtype=float)
+    n_series, n_points = prices.shape
     
-    # Média móvel simples
-    middle_band = prices.rolling(window=period).mean()
+    if n_points < period:
+        last = prices[:, -1] if n_points > 0 else np.zeros(n_series)
+        return {'upper': last, 'middle': last.copy(), 'lower': last.copy(),
+                'width': np.zeros(n_series)}
     
-    # Desvio padrão
-    std = prices.rolling(window=period).std()
+    # Média e desvio padrão (amostral, como no pandas) da última janela
+    window = prices[:, -period:]
+    middle_band = window.mean(axis=1)
+    std = window.std(axis=1, ddof=1)
     
     # Bandas superior e inferior
     upper_band = middle_band + (std * std_dev)
     lower_band = middle_band - (std * std_dev)
     
     # Largura das bandas (normalizada)
-    width = ((upper_band - lower_band) / middle_band) * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        width = ((upper_band - lower_band) / middle_band) * 100
     
     return {
-        'upper': upper_band.iloc[-1],
-        'middle': middle_band.iloc[-1],
-        'lower': lower_band.iloc[-1],
-        'width': width.iloc[-1] if not np.isnan(width.iloc[-1]) else 0
+        'upper': upper_band,
+        'middle': middle_band,
+        'lower': lower_band,
+        'width': np.where(np.isnan(width), 0, width)
     }
 
+def calculate_bollinger_bands(prices: pd.Series, period: int = 20, std_dev: int = 2) -> dict:
+    """
+    Calcula Bandas de Bollinger
+    
+    Args:
+        prices: Série de preços
+        period: Período da média móvel
+        std_dev: Número de desvios padrão
+    
+    Returns:
+        Dict com upper_band, middle_band, lower_band
+    """
+    bb = calculate_bollinger_bands_batch(prices.to_numpy(dtype=float)[None, :], period, std_dev)
+    return {key: values[0] for key, values in bb.items()}
+
 def get_bb_position(current_price: float, bb_data: dict) -> float:
     """
     Calcula posição do preço nas Bandas de Bollinger (0 a 1)
@@ -99,6 +135,42 @@ def get_bb_signal(position: float, width: float) -> str:
     else:
         return "ALTA"
 
+def get_bb_signals(position: np.ndarray) -> np.ndarray:
+    """
+    Versão vetorizada de get_bb_signal para um array de posições
+    """
+    position = np.asarray(position, dtype=float)
+    return np.select(
+        [position < 0.2, position > 0.8, (position >= 0.4) & (position <= 0.6), position < 0.5],
+        ["SOBREVENDIDO", "SOBRECOMPRADO", "NEUTRO", "BAIXA"],
+        default="ALTA"
+    )
+
+def calculate_historical_volatility_batch(prices: np.ndarray, period: int = 30) -> np.ndarray:
+    """
+    Calcula volatilidade histórica de várias séries de uma vez
+    
+    Args:
+        prices: Matriz de preços (séries x pontos)
+        period: Período para cálculo
+    
+    Returns:
+        Array com a volatilidade final de cada série, em percentual
+    """
+    prices = np.asarray(prices, dtype=float)
+    n_series, n_points = prices.shape
+    
+    # A janela final precisa de `period` retornos, ou seja, period + 1 preços
+    if n_points < period + 1:
+        return np.zeros(n_series)
+    
+    # Retornos logarítmicos e desvio padrão anualizado só da última janela
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(prices[:, -(period + 1):]), axis=1)
+        volatility = returns.std(axis=1, ddof=1) * np.sqrt(365) * 100
+    
+    return np.where(np.isnan(volatility), 0.0, volatility)
+
 def calculate_historical_volatility(prices: pd.Series, period: int = 30) -> float:
     """
     Calcula volatilidade histórica (desvio padrão dos retornos)
@@ -110,16 +182,7 @@ def calculate_historical_volatility(prices: pd.Series, period: int = 30) -> floa
     Returns:
         Volatilidade em percentual
     """
-    if len(prices) < 2:
-        return 0.0
-    
-    # Calcular retornos logarítmicos
-    returns = np.log(prices / prices.shift(1))
-    
-    # Calcular volatilidade (desvio padrão anualizado)
-    volatility = returns.rolling(window=period).std() * np.sqrt(365) * 100
-    
-    return volatility.iloc[-1] if not np.isnan(volatility.iloc[-1]) else 0.0
+    return calculate_historical_volatility_batch(prices.to_numpy(dtype=float)[None, :], period)[0]
 
 def calculate_keltner_channels(high: pd.Series, low: pd.Series, close: pd.Series, 
                                period: int = 20, atr_mult: float = 2.0) -> dict:
@@ -137,23 +200,68 @@ def calculate_keltner_channels(high: pd.Series, low: pd.Series, close: pd.Series
         Dict com upper, middle, lower
     """
     if len(close) < period:
-        current = close.iloc[-1] if len(close) > 0 else 0
+        current = close.iat[-1] if len(close) > 0 else 0
         return {'upper': current, 'middle': current, 'lower': current}
     
-    # Linha central (EMA)
-    middle = close.ewm(span=period, adjust=False).mean()
+    bands = calculate_bands_batch(high.to_numpy(dtype=float)[None, :],
+                                  low.to_numpy(dtype=float)[None, :],
+                                  close.to_numpy(dtype=float)[None, :],
+                                  period, atr_mult=atr_mult)
+    return {key: bands[f'kc_{key}'][0] for key in ('upper', 'middle', 'lower')}
+
+@lru_cache(maxsize=16)
+def _ema_last_weights(span: int, n_points: int) -> np.ndarray:
+    """
+    Pesos de cada preço no último valor da EMA (adjust=False, semente no primeiro preço)
+    """
+    alpha = 2 / (span + 1)
+    weights = alpha * (1 - alpha) ** np.arange(n_points - 1, -1, -1)
+    weights[0] = (1 - alpha) ** (n_points - 1)
+    weights.setflags(write=False)
+    return weights
+
+def calculate_bands_batch(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                          period: int = 20, std_dev: int = 2,
+                          atr_mult: float = 2.0) -> dict:
+    """
+    Bandas de Bollinger, Canais de Keltner e squeeze de várias séries em uma passada
     
-    # Calcular ATR
-    atr = calculate_atr(high, low, close, period)
+    A janela final de `period` candles é compartilhada pela média/desvio das
+    bandas e pelo ATR dos canais; a EMA central é um produto escalar.
     
-    # Canais
-    upper = middle + (atr * atr_mult)
-    lower = middle - (atr * atr_mult)
+    Args:
+        high, low, close: Matrizes de preços (séries x pontos)
+        period: Período das bandas, da EMA e do ATR
+        std_dev: Número de desvios padrão das bandas
+        atr_mult: Multiplicador do ATR dos canais
+    
+    Returns:
+        Dict com arrays bb_upper/bb_middle/bb_lower, kc_upper/kc_middle/kc_lower
+        e squeeze (bandas dentro dos canais)
+    """
+    close = np.asarray(close, dtype=float)
+    n_series, n_points = close.shape
+    
+    bb = calculate_bollinger_bands_batch(close, period, std_dev)
+    
+    if n_points < period:
+        kc_middle = close[:, -1] if n_points > 0 else np.zeros(n_series)
+        kc_offset = np.zeros(n_series)
+    else:
+        kc_middle = close @ _ema_last_weights(period, n_points)
+        kc_offset = calculate_atr_batch(high, low, close, period) * atr_mult
+    
+    kc_upper = kc_middle + kc_offset
+    kc_lower = kc_middle - kc_offset
     
     return {
-        'upper': upper.iloc[-1],
-        'middle': middle.iloc[-1],
-        'lower': lower.iloc[-1]
+        'bb_upper': bb['upper'],
+        'bb_middle': bb['middle'],
+        'bb_lower': bb['lower'],
+        'kc_upper': kc_upper,
+        'kc_middle': kc_middle,
+        'kc_lower': kc_lower,
+        'squeeze': (bb['upper'] - bb['lower']) < (kc_upper - kc_lower)
     }
 
 def calculate_volatility_ratio(current_volatility: float, avg_volatility: float) -> float:
@@ -180,88 +288,86 @@ def get_volatility_level(volatility: float) -> str:
     else:
         return "MUITO ALTA"
 
-def calculate_volatility_indicators(df: pd.DataFrame) -> pd.DataFrame:
+def get_volatility_levels(volatility: np.ndarray) -> np.ndarray:
     """
-    Calcula indicadores de volatilidade para todo o DataFrame
+    Versão vetorizada de get_volatility_level para um array de volatilidades
+    """
+    volatility = np.asarray(volatility, dtype=float)
+    return np.select(
+        [volatility < 20, volatility < 40, volatility < 60, volatility < 80],
+        ["MUITO BAIXA", "BAIXA", "MODERADA", "ALTA"],
+        default="MUITO ALTA"
+    )
+
+# Tipos compactos das colunas de saída (sinais têm poucos valores distintos)
+VOLATILITY_COLUMN_DTYPES = {
+    'atr': 'float32',
+    'atr_pct': 'float32',
+    'bb_position': 'float32',
+    'bb_width': 'float32',
+    'volatility_score': 'float32',
+    'bb_signal': 'category',
+    'volatility_level': 'category'
+}
+
+# Colunas de entrada dos indicadores (o cache depende só delas)
+VOLATILITY_INPUT_COLUMNS = ['current_price', 'high_24h', 'low_24h', 'price_change_percentage_24h']
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _volatility_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
-    df = df.copy()
-    
-    # Listas para armazenar resultados
-    atr_values = []
-    atr_percentages = []
-    bb_positions = []
-    bb_signals = []
-    bb_widths = []
-    volatility_levels = []
-    volatility_scores = []
-    
-    for idx, row in df.iterrows():
-        try:
-            # Obter dados
-            current_price = row['current_price']
-            high_24h = row['high_24h']
-            low_24h = row['low_24h']
-            price_change = row.get('price_change_percentage_24h', 0)
-            
-            # Criar séries sintéticas
-            prices = []
-            highs = []
-            lows = []
-            
-            for i in range(30):
-                progress = i / 30
-                estimated_change = price_change * progress
-                base_price = current_price / (1 + price_change / 100)
-                estimated_price = base_price * (1 + estimated_change / 100)
-                
-                # Adicionar variação
-                noise = np.random.uniform(-0.02, 0.02)
-                estimated_price *= (1 + noise)
-                
-                prices.append(estimated_price)
-                highs.append(estimated_price * 1.01)
-                lows.append(estimated_price * 0.99)
-            
-            price_series = pd.Series(prices)
-            high_series = pd.Series(highs)
-            low_series = pd.Series(lows)
-            
-            # Calcular ATR
-            atr = calculate_atr(high_series, low_series, price_series)
-            atr_pct = (atr / current_price) * 100 if current_price > 0 else 0
-            
-            atr_values.append(atr)
-            atr_percentages.append(atr_pct)
-            
-            # Calcular Bandas de Bollinger
-            bb_data = calculate_bollinger_bands(price_series)
-            bb_position = get_bb_position(current_price, bb_data)
-            bb_signal = get_bb_signal(bb_position, bb_data['width'])
-            
-            bb_positions.append(bb_position)
-            bb_signals.append(bb_signal)
-            bb_widths.append(bb_data['width'])
-            
-            # Calcular volatilidade histórica
-            hist_vol = calculate_historical_volatility(price_series)
-            vol_level = get_volatility_level(hist_vol)
-            
-            volatility_levels.append(vol_level)
-            
-            # Score de volatilidade (0-100, menor é melhor)
-            # Baseado em ATR% e largura das BB
-            vol_score = min(100, (atr_pct * 10) + (bb_data['width'] * 2))
-            volatility_scores.append(vol_score)
-            
-        except Exception as e:
-            # Valores padrão em caso de erro
-            atr_values.append(0)
-            atr_percentages.append(0)
-            bb_positions.append(0.5)
-            bb_signals.append("NEUTRO")
-            bb_widths.append(0)
-            volatility_levels.append("BAIXA")
-            volatility_scores.append(50)
+    Indicadores de volatilidade calculados só a partir das colunas de entrada
+    (cache de 60s indexado por VOLATILITY_INPUT_COLUMNS)
+    """
+    df = df.copy(deep=False)
+    
+    n = len(df)
+    
+    # Sem os dados de 24h, todas as moedas recebem valores padrão
+    if not {'current_price', 'high_24h', 'low_24h'}.issubset(df.columns):
+        df['atr'] = [0] * n
+        df['atr_pct'] = [0] * n
+        df['bb_position'] = [0.5] * n
+        df['bb_signal'] = ["NEUTRO"] * n
+        df['bb_width'] = [0] * n
+        df['volatility_level'] = ["BAIXA"] * n
+        df['volatility_score'] = [50] * n
+        return df.astype(VOLATILITY_COLUMN_DTYPES)
+    
+    current_price = df['current_price'].to_numpy(dtype=float)
+    if 'price_change_percentage_24h' in df.columns:
+        price_change = df['price_change_percentage_24h'].to_numpy(dtype=float)
+    else:
+        price_change = np.zeros(n)
+    
+    # Séries sintéticas de 30 pontos para todas as moedas
+    prices = synthetic_price_matrix(current_price, price_change, noise=0.02)
+    
+    # Calcular ATR
+    atr_values = calculate_atr_batch(prices * 1.01, prices * 0.99, prices, VOLATILITY.atr_period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        atr_percentages = np.where(current_price > 0, (atr_values / current_price) * 100, 0)
+    
+    # Calcular Bandas de Bollinger
+    bb_data = calculate_bollinger_bands_batch(prices, VOLATILITY.bb_period, VOLATILITY.bb_std_dev)
+    bb_widths = bb_data['width']
+    
+    # Posição nas bandas (mesmos limites de get_bb_position)
+    band_range = bb_data['upper'] - bb_data['lower']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bb_positions = (current_price - bb_data['lower']) / band_range
+    bb_positions = np.where(band_range == 0, 0.5,
+                            np.where(np.isnan(bb_positions), 1.0, np.clip(bb_positions, 0, 1)))
+    
+    bb_signals = get_bb_signals(bb_positions)
+    
+    # Calcular volatilidade histórica
+    hist_vol = calculate_historical_volatility_batch(prices, VOLATILITY.historical_vol_period)
+    volatility_levels = get_volatility_levels(hist_vol)
+    
+    # Score de volatilidade (0-100, menor é melhor)
+    # Baseado em ATR% e largura das BB
+    volatility_scores = np.fmin(100, (atr_percentages * 10) + (bb_widths * 2))
     
     # Adicionar colunas ao DataFrame
     df['atr'] = atr_values
@@ -272,6 +378,21 @@ def calculate_volatility_indicators(df: pd.DataFrame) -> pd.DataFrame:
     df['volatility_level'] = volatility_levels
     df['volatility_score'] = volatility_scores
     
+    return df.astype(VOLATILITY_COLUMN_DTYPES)
+
+def calculate_volatility_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula indicadores de volatilidade para todo o DataFrame
+    """
+    df = df.copy(deep=False)
+    
+    inputs = df[[c for c in VOLATILITY_INPUT_COLUMNS if c in df.columns]].reset_index(drop=True)
+    columns = _volatility_columns(inputs)
+    
+    # Resultado do cache alinhado por posição ao índice original
+    for column in columns.columns.drop(inputs.columns):
+        df[column] = columns[column].set_axis(df.index)
+    
     return df
 
 def format_volatility_display(row) -> str:
@@ -321,10 +442,16 @@ def get_volatility_trend(volatilities: list) -> str:
     if len(volatilities) < 3:
         return "ESTÁVEL"
     
-    recent = volatilities[-3:]
-    if all(recent[i] > recent[i-1] for i in range(1, len(recent))):
-        return "CRESCENTE"
-    elif all(recent[i] < recent[i-1] for i in range(1, len(recent))):
-        return "DECRESCENTE"
-    else:
-        return "ESTÁVEL"
\ No newline at end of file
+    return str(get_volatility_trends(np.asarray(volatilities[-3:], dtype=float)[None, :])[0])
+
+def get_volatility_trends(volatilities: np.ndarray) -> np.ndarray:
+    """
+    Versão vetorizada de get_volatility_trend para uma matriz (séries x pontos)
+    """
+    volatilities = np.asarray(volatilities, dtype=float)
+    if volatilities.shape[1] < 3:
+        return np.full(volatilities.shape[0], "ESTÁVEL")
+    
+    # Soma dos sinais das duas últimas variações: ±2 só se ambas forem no mesmo sentido
+    signs = np.sign(np.diff(volatilities[:, -3:], axis=1)).sum(axis=1)
+    return np.select([signs == 2, signs == -2], ["CRESCENTE", "DECRESCENTE"], default="ESTÁVEL")
\ No newline at end of file
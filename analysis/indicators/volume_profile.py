@@ -2,6 +2,17 @@ import pandas as pd
 import numpy as np
 import streamlit as st
 from typing import Tuple, Dict
+from utils._njit import njit, NUMBA_AVAILABLE
+
+# Rótulos das colunas categóricas, do menor para o maior nível
+VOLUME_SPIKE_LEVELS = ["➡️ NORMAL", "📊 MODERADO", "📈 ALTO", "🚀 MUITO ALTO", "🔥 EXTREMO"]
+VOLUME_CLASSIFICATIONS = ["📉 BAIXO", "📊 NORMAL", "📈 ALTO", "🔥 MUITO ALTO"]
+LIQUIDITY_RATINGS = ["⭐", "⭐⭐", "⭐⭐⭐", "⭐⭐⭐⭐", "⭐⭐⭐⭐⭐"]
+VOLUME_MOMENTUM_LEVELS = ["📉 BAIXO", "➡️ MODERADO", "📈 ALTO", "🚀 EXTREMO"]
+
+# Sinais do Volume Profile (sem ordem)
+VOLUME_PROFILE_SIGNALS = ["NEUTRO", "🟢 COMPRA FORTE", "🔴 VENDA FORTE", "⚪ POC - NEUTRO",
+                          "🟢 COMPRA", "🔴 VENDA", "⚪ NEUTRO"]
 
 def calculate_volume_spike(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -13,7 +24,7 @@ def calculate_volume_spike(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame com coluna 'volume_spike' adicionada
     """
-    df = df.copy()
+    df = df.copy(deep=False)
     
     # Calcular volume médio (assumindo que o volume atual representa últimas 24h)
     # Volume spike = volume_atual / volume_médio
@@ -22,41 +33,39 @@ def calculate_volume_spike(df: pd.DataFrame) -> pd.DataFrame:
         df['volume_spike'] = 1.0
         return df
     
+    volume = df['total_volume'].to_numpy(dtype=float)
+    if 'market_cap' in df.columns:
+        market_cap = df['market_cap'].to_numpy(dtype=float)
+    else:
+        market_cap = np.ones(len(df))
+    
     # Calcular média de volume do mercado
     avg_volume = df['total_volume'].median()
     
-    volume_spikes = []
-    volume_percentiles = []
-    
-    for idx, row in df.iterrows():
-        current_volume = row['total_volume']
-        market_cap = row.get('market_cap', 1)
-        
+    with np.errstate(divide='ignore', invalid='ignore'):
         # Normalizar volume pelo market cap para comparação justa
-        volume_to_mcap_ratio = (current_volume / market_cap) if market_cap > 0 else 0
+        volume_to_mcap_ratio = np.where(market_cap > 0, volume / market_cap, 0)
         
         # Calcular spike baseado em múltiplos fatores
         # 1. Volume absoluto vs média
-        volume_vs_avg = current_volume / avg_volume if avg_volume > 0 else 1
-        
-        # 2. Volume/Market Cap ratio (quanto maior, mais líquido)
-        expected_ratio = 0.1  # 10% é considerado normal
-        ratio_multiplier = volume_to_mcap_ratio / expected_ratio if expected_ratio > 0 else 1
-        
-        # Score combinado de spike
-        spike_score = (volume_vs_avg * 0.7) + (ratio_multiplier * 0.3)
-        
-        volume_spikes.append(spike_score)
-        
-        # Calcular percentil de volume
-        percentile = (df['total_volume'] <= current_volume).sum() / len(df) * 100
-        volume_percentiles.append(percentile)
+        volume_vs_avg = volume / avg_volume if avg_volume > 0 else np.ones(len(df))
+    
+    # 2. Volume/Market Cap ratio (quanto maior, mais líquido)
+    expected_ratio = 0.1  # 10% é considerado normal
+    ratio_multiplier = volume_to_mcap_ratio / expected_ratio
     
-    df['volume_spike'] = volume_spikes
-    df['volume_percentile'] = volume_percentiles
+    # Score combinado de spike
+    df['volume_spike'] = (volume_vs_avg * 0.7) + (ratio_multiplier * 0.3)
+    
+    # Percentil de volume: quantas moedas têm volume <= ao atual (busca binária no array ordenado)
+    valid = ~np.isnan(volume)
+    sorted_volume = np.sort(volume[valid])
+    counts = np.where(valid, np.searchsorted(sorted_volume, volume, side='right'), 0)
+    df['volume_percentile'] = counts / max(len(df), 1) * 100
     
     # Classificar intensidade do spike
-    df['volume_spike_level'] = df['volume_spike'].apply(classify_volume_spike)
+    df['volume_spike_level'] = pd.Categorical(classify_volume_spikes(df['volume_spike']),
+                                              categories=VOLUME_SPIKE_LEVELS, ordered=True)
     
     return df
 
@@ -73,6 +82,15 @@ def classify_volume_spike(spike_value: float) -> str:
     else:
         return "➡️ NORMAL"
 
+def classify_volume_spikes(spike_values: np.ndarray) -> np.ndarray:
+    """Versão vetorizada de classify_volume_spike para um array de spikes"""
+    spike_values = np.asarray(spike_values, dtype=float)
+    return np.select(
+        [spike_values >= 3.0, spike_values >= 2.0, spike_values >= 1.5, spike_values >= 1.2],
+        ["🔥 EXTREMO", "🚀 MUITO ALTO", "📈 ALTO", "📊 MODERADO"],
+        default="➡️ NORMAL"
+    )
+
 def calculate_volume_profile(high: pd.Series, low: pd.Series, volume: pd.Series, 
                            price_levels: int = 20) -> Dict:
     """
@@ -100,38 +118,42 @@ def calculate_volume_profile(high: pd.Series, low: pd.Series, volume: pd.Series,
         # Criar níveis de preço
         price_range = np.linspace(min_price, max_price, price_levels)
         
-        # Calcular volume por nível de preço
-        volume_at_price = {}
+        h = high.to_numpy(dtype=float)
+        l = low.to_numpy(dtype=float)
+        v = volume.to_numpy(dtype=float)
         
-        for i in range(len(high)):
-            for level in price_range:
-                if low.iloc[i] <= level <= high.iloc[i]:
-                    if level in volume_at_price:
-                        volume_at_price[level] += volume.iloc[i]
-                    else:
-                        volume_at_price[level] = volume.iloc[i]
+        # Matriz candles x níveis: nível dentro da faixa [mínima, máxima] do candle
+        in_range = (l[:, None] <= price_range) & (price_range <= h[:, None])
+        touched = in_range.any(axis=0)
         
-        if not volume_at_price:
+        if not touched.any():
             return {}
         
-        # POC (Point of Control) - nível com maior volume
-        poc_price = max(volume_at_price, key=volume_at_price.get)
-        total_volume = sum(volume_at_price.values())
+        # Volume por nível somado na ordem dos candles (cumsum é sequencial)
+        level_volume = np.where(in_range, v[:, None], 0.0).cumsum(axis=0)[-1]
+        
+        # Níveis na ordem em que são tocados pela primeira vez (candle, depois preço)
+        first_touch = in_range.argmax(axis=0)
+        order = np.lexsort((np.arange(price_levels), first_touch))
+        order = order[touched[order]]
         
-        # Value Area (70% do volume)
-        sorted_levels = sorted(volume_at_price.items(), key=lambda x: x[1], reverse=True)
+        levels = price_range[order]
+        level_vols = level_volume[order]
         
-        cumulative_volume = 0
-        value_area_levels = []
+        # POC (Point of Control) - nível com maior volume
+        poc_price = levels[np.argmax(level_vols)]
+        total_volume = level_vols.cumsum()[-1]
         
-        for level, vol in sorted_levels:
-            cumulative_volume += vol
-            value_area_levels.append(level)
-            if cumulative_volume >= total_volume * 0.7:
-                break
+        # Value Area (70% do volume): níveis por volume decrescente até 70%
+        by_volume = np.argsort(-level_vols, kind='stable')
+        cumulative = level_vols[by_volume].cumsum()
+        reached = cumulative >= total_volume * 0.7
+        stop = np.argmax(reached) if reached.any() else len(cumulative) - 1
+        cumulative_volume = cumulative[stop]
+        value_area_levels = levels[by_volume[:stop + 1]]
         
-        vah = max(value_area_levels)  # Value Area High
-        val = min(value_area_levels)  # Value Area Low
+        vah = value_area_levels.max()  # Value Area High
+        val = value_area_levels.min()  # Value Area Low
         
         return {
             'poc': poc_price,
@@ -139,7 +161,7 @@ def calculate_volume_profile(high: pd.Series, low: pd.Series, volume: pd.Series,
             'val': val,
             'total_volume': total_volume,
             'value_area_volume': cumulative_volume,
-            'volume_profile': volume_at_price,
+            'volume_profile': dict(zip(levels, level_vols)),
             'price_range_min': min_price,
             'price_range_max': max_price,
             'value_area_percentage': (cumulative_volume / total_volume) * 100
@@ -179,6 +201,66 @@ def volume_profile_signal(current_price: float, volume_profile_data: Dict) -> st
     else:
         return "⚪ NEUTRO"
 
+def single_bar_volume_profile(high: np.ndarray, low: np.ndarray, volume: np.ndarray,
+                              price_levels: int = 20) -> Dict:
+    """
+    Volume Profile de um único candle por moeda, em forma fechada
+    
+    Com um só candle todos os níveis entre mínima e máxima recebem o mesmo
+    volume, então calculate_volume_profile sempre escolhe o primeiro nível
+    (a mínima) como POC e VAL, e a Value Area sobe nível a nível até 70%.
+    
+    Args:
+        high: Máxima de cada moeda
+        low: Mínima de cada moeda
+        volume: Volume de cada moeda
+        price_levels: Número de níveis de preço
+    
+    Returns:
+        Dict com arrays poc, vah, val e valid (moedas com profile não vazio)
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    
+    # Profile vazio quando a faixa é nula, invertida ou ausente
+    valid = low < high
+    
+    # Níveis como no np.linspace escalar (a versão com arrays arredonda diferente)
+    with np.errstate(invalid='ignore'):
+        step = (high - low) / (price_levels - 1)
+        levels = np.arange(price_levels) * step[:, None] + low[:, None]
+    levels[:, -1] = high
+    
+    # Volume acumulado nível a nível (mesma ordem de soma do loop original)
+    cumulative = np.cumsum(np.repeat(volume[:, None], price_levels, axis=1), axis=1)
+    reached = cumulative >= cumulative[:, -1:] * 0.7
+    last_level = np.where(reached.any(axis=1), reached.argmax(axis=1), price_levels - 1)
+    
+    return {
+        'poc': low,
+        'vah': levels[np.arange(len(levels)), last_level],
+        'val': low,
+        'valid': valid
+    }
+
+def volume_profile_signals(current_price: np.ndarray, vp_data: Dict) -> np.ndarray:
+    """
+    Versão vetorizada de volume_profile_signal para arrays de single_bar_volume_profile
+    """
+    current_price = np.asarray(current_price, dtype=float)
+    poc, vah, val = vp_data['poc'], vp_data['vah'], vp_data['val']
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        near_poc = np.abs(current_price - poc) / poc < 0.02
+    
+    signals = np.select(
+        [current_price < val, current_price > vah, near_poc, current_price < poc, current_price > poc],
+        ["🟢 COMPRA FORTE", "🔴 VENDA FORTE", "⚪ POC - NEUTRO", "🟢 COMPRA", "🔴 VENDA"],
+        default="⚪ NEUTRO"
+    )
+    return np.where(vp_data['valid'], signals, "NEUTRO")
+
 def calculate_vwap(high: pd.Series, low: pd.Series, close: pd.Series, 
                   volume: pd.Series) -> pd.Series:
     """
@@ -241,6 +323,36 @@ def calculate_volume_trend(volumes: pd.Series, period: int = 14) -> Dict:
         'change_pct': change_pct
     }
 
+@njit(cache=True)
+def _obv_kernel(close, volume):
+    """OBV acumulado sobre arrays (preço igual ou NaN mantém o valor anterior)"""
+    n = len(close)
+    obv = np.empty(n)
+    if n == 0:
+        return obv
+    
+    obv[0] = volume[0]
+    for i in range(1, n):
+        if close[i] > close[i - 1]:
+            obv[i] = obv[i - 1] + volume[i]
+        elif close[i] < close[i - 1]:
+            obv[i] = obv[i - 1] - volume[i]
+        else:
+            obv[i] = obv[i - 1]
+    return obv
+
+def _obv_numpy(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """OBV vetorizado com o sinal das variações e soma acumulada"""
+    if len(close) == 0:
+        return np.empty(0)
+    
+    # Direção de cada candle (preço igual ou NaN contribui com zero)
+    direction = np.sign(np.diff(close))
+    steps = np.select([direction > 0, direction < 0], [volume[1:], -volume[1:]], default=0.0)
+    
+    # Soma acumulada a partir do primeiro volume, na mesma ordem do laço
+    return np.cumsum(np.concatenate((volume[:1], steps)))
+
 def calculate_obv(close: pd.Series, volume: pd.Series) -> pd.Series:
     """
     Calcula OBV (On-Balance Volume)
@@ -252,18 +364,13 @@ def calculate_obv(close: pd.Series, volume: pd.Series) -> pd.Series:
     Returns:
         Série com OBV
     """
-    obv = pd.Series(index=close.index, dtype=float)
-    obv.iloc[0] = volume.iloc[0]
-    
-    for i in range(1, len(close)):
-        if close.iloc[i] > close.iloc[i-1]:
-            obv.iloc[i] = obv.iloc[i-1] + volume.iloc[i]
-        elif close.iloc[i] < close.iloc[i-1]:
-            obv.iloc[i] = obv.iloc[i-1] - volume.iloc[i]
-        else:
-            obv.iloc[i] = obv.iloc[i-1]
+    close_values = close.to_numpy(dtype=np.float64)
+    volume_values = volume.to_numpy(dtype=np.float64)
     
-    return obv
+    # Sem numba o laço do kernel rodaria em Python puro
+    obv_func = _obv_kernel if NUMBA_AVAILABLE else _obv_numpy
+    obv = obv_func(close_values, volume_values)
+    return pd.Series(obv, index=close.index)
 
 def volume_based_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -275,45 +382,27 @@ def volume_based_indicators(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame com colunas adicionais dos indicadores
     """
-    df = df.copy()
+    df = df.copy(deep=False)
     
     # Calcular VWAP simplificado
     if all(col in df.columns for col in ['high_24h', 'low_24h', 'current_price', 'total_volume']):
-        vwaps = []
-        for idx, row in df.iterrows():
-            typical_price = (row['high_24h'] + row['low_24h'] + row['current_price']) / 3
-            vwaps.append(typical_price)
-        df['vwap'] = vwaps
-    
-    # Calcular Volume Profile simplificado
-    volume_profile_signals = []
-    volume_profile_strength = []
-    poc_distances = []
-    
-    for idx, row in df.iterrows():
-        high = pd.Series([row['high_24h']])
-        low = pd.Series([row['low_24h']])
-        volume = pd.Series([row['total_volume']])
-        
-        vp_data = calculate_volume_profile(high, low, volume, price_levels=10)
-        signal = volume_profile_signal(row['current_price'], vp_data)
-        
-        volume_profile_signals.append(signal)
-        
-        # Calcular força do sinal
-        if vp_data and 'poc' in vp_data:
-            distance_from_poc = abs(row['current_price'] - vp_data['poc']) / vp_data['poc']
-            strength = min(100, distance_from_poc * 500)
-            poc_distances.append(distance_from_poc * 100)
-        else:
-            strength = 0
-            poc_distances.append(0)
-        
-        volume_profile_strength.append(strength)
+        df['vwap'] = (df['high_24h'] + df['low_24h'] + df['current_price']) / 3
     
-    df['volume_profile_signal'] = volume_profile_signals
-    df['volume_profile_strength'] = volume_profile_strength
-    df['poc_distance_pct'] = poc_distances
+    # Calcular Volume Profile simplificado (um candle de 24h por moeda)
+    current_price = df['current_price'].to_numpy(dtype=float)
+    vp_data = single_bar_volume_profile(df['high_24h'].to_numpy(dtype=float),
+                                        df['low_24h'].to_numpy(dtype=float),
+                                        df['total_volume'].to_numpy(dtype=float),
+                                        price_levels=10)
+    
+    # Calcular força do sinal
+    with np.errstate(divide='ignore', invalid='ignore'):
+        distance_from_poc = np.abs(current_price - vp_data['poc']) / vp_data['poc']
+    
+    df['volume_profile_signal'] = pd.Categorical(volume_profile_signals(current_price, vp_data),
+                                                 categories=VOLUME_PROFILE_SIGNALS)
+    df['volume_profile_strength'] = np.where(vp_data['valid'], np.fmin(100, distance_from_poc * 500), 0)
+    df['poc_distance_pct'] = np.where(vp_data['valid'], distance_from_poc * 100, 0)
     
     # Calcular volume relativo
     if 'total_volume' in df.columns:
@@ -321,22 +410,21 @@ def volume_based_indicators(df: pd.DataFrame) -> pd.DataFrame:
         df['volume_ratio'] = df['total_volume'] / median_volume
         
         # Classificar volume
-        df['volume_classification'] = df['volume_ratio'].apply(
-            lambda x: "🔥 MUITO ALTO" if x > 2 else 
-                     "📈 ALTO" if x > 1.5 else 
-                     "📊 NORMAL" if x > 0.5 else 
-                     "📉 BAIXO"
-        )
+        ratio = df['volume_ratio'].to_numpy(dtype=float)
+        df['volume_classification'] = pd.Categorical(np.select(
+            [ratio > 2, ratio > 1.5, ratio > 0.5],
+            ["🔥 MUITO ALTO", "📈 ALTO", "📊 NORMAL"],
+            default="📉 BAIXO"
+        ), categories=VOLUME_CLASSIFICATIONS, ordered=True)
     
     # Adicionar indicadores de liquidez
     df['liquidity_score'] = (df['total_volume'] / df['market_cap']) * 100
-    df['liquidity_rating'] = df['liquidity_score'].apply(
-        lambda x: "⭐⭐⭐⭐⭐" if x > 20 else
-                 "⭐⭐⭐⭐" if x > 10 else
-                 "⭐⭐⭐" if x > 5 else
-                 "⭐⭐" if x > 2 else
-                 "⭐"
-    )
+    liquidity = df['liquidity_score'].to_numpy(dtype=float)
+    df['liquidity_rating'] = pd.Categorical(np.select(
+        [liquidity > 20, liquidity > 10, liquidity > 5, liquidity > 2],
+        ["⭐⭐⭐⭐⭐", "⭐⭐⭐⭐", "⭐⭐⭐", "⭐⭐"],
+        default="⭐"
+    ), categories=LIQUIDITY_RATINGS, ordered=True)
     
     return df
 
@@ -351,7 +439,7 @@ def detect_volume_anomalies(df: pd.DataFrame, std_threshold: float = 2.5) -> pd.
     Returns:
         DataFrame com coluna 'volume_anomaly'
     """
-    df = df.copy()
+    df = df.copy(deep=False)
     
     if 'total_volume' not in df.columns:
         df['volume_anomaly'] = False
@@ -376,17 +464,17 @@ def calculate_volume_momentum(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame com coluna 'volume_momentum'
     """
-    df = df.copy()
+    df = df.copy(deep=False)
     
     # Como temos apenas snapshot, usar volume vs market cap como proxy
     if 'total_volume' in df.columns and 'market_cap' in df.columns:
         df['volume_momentum'] = (df['total_volume'] / df['market_cap']) * 100
         
-        df['volume_momentum_level'] = df['volume_momentum'].apply(
-            lambda x: "🚀 EXTREMO" if x > 30 else
-                     "📈 ALTO" if x > 15 else
-                     "➡️ MODERADO" if x > 5 else
-                     "📉 BAIXO"
-        )
+        momentum = df['volume_momentum'].to_numpy(dtype=float)
+        df['volume_momentum_level'] = pd.Categorical(np.select(
+            [momentum > 30, momentum > 15, momentum > 5],
+            ["🚀 EXTREMO", "📈 ALTO", "➡️ MODERADO"],
+            default="📉 BAIXO"
+        ), categories=VOLUME_MOMENTUM_LEVELS, ordered=True)
     
     return df
\ No newline at end of file
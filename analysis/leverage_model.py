@@ -1,5 +1,5 @@
 import pandas as pd
-import numpy as np
+from data.config import leverage_for
 
 def calculate_leverage_suggestion(df):
     """
@@ -11,16 +11,14 @@ def calculate_leverage_suggestion(df):
     Returns:
         pandas.DataFrame: DataFrame com coluna 'leverage_suggestion' adicionada
     """
-    df = df.copy()
+    df = df.copy(deep=False)
     
     # Fórmula: leverage = max(1, 10 - (risk / 10))
     # Risco 0 → Alavancagem 10x
     # Risco 50 → Alavancagem 5x  
     # Risco 100 → Alavancagem 1x
-    df['leverage_suggestion'] = np.maximum(1, 10 - (df['risk_score'] / 10))
-    
-    # Arredondar para 1 casa decimal
-    df['leverage_suggestion'] = df['leverage_suggestion'].round(1)
+    # Valores já arredondados para 1 casa decimal na tabela LEVERAGE_LUT
+    df['leverage_suggestion'] = leverage_for(df['risk_score'].to_numpy())
     
     return df
 
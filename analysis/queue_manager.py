@@ -1,29 +1,69 @@
 import time
+import heapq
+import random
+import itertools
 import threading
-from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from collections import OrderedDict, deque, defaultdict
 from datetime import datetime, timedelta
 import asyncio
 import pandas as pd
+import requests
+from data.config import API_RATE_LIMIT
+from utils.rate_limit import TokenBucket
+
+# Ordem de atendimento das prioridades (menor sai primeiro)
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+# Janela de tempos de resposta usada na média móvel
+RESPONSE_TIME_WINDOW = 100
+
+def _timed_call(func, args, kwargs):
+    """Executa a requisição na thread do pool e mede o tempo de resposta"""
+    request_start = time.time()
+    result = func(*args, **kwargs)
+    return result, time.time() - request_start
+
+def _retry_delay(response, attempt):
+    """
+    Espera antes de repetir uma requisição recusada por rate limit (429)
+    
+    Usa o Retry-After do servidor quando presente; senão API_RATE_LIMIT['retry_wait'],
+    crescente a cada tentativa se 'progressive_wait'. O jitter aleatório evita
+    que workers recusados juntos repitam todos no mesmo instante.
+    """
+    try:
+        wait = float(response.headers['Retry-After'])
+    except (KeyError, TypeError, ValueError):
+        wait = API_RATE_LIMIT['retry_wait']
+        if API_RATE_LIMIT['progressive_wait']:
+            wait *= attempt + 1
+    return wait + random.uniform(0, min(2 ** attempt, 10))
 
 class SmartRequestQueueManager:
     """
     Gerenciador de fila inteligente com prioridades e cache distribuído
     """
     
-    def __init__(self, max_requests_per_minute=45, request_interval=1.5):
+    def __init__(self, max_requests_per_minute=45, request_interval=1.5, max_cache_size=1000,
+                 max_workers=8):
         self.max_requests_per_minute = max_requests_per_minute
         self.request_interval = request_interval
+        self.max_cache_size = max_cache_size
         
-        # Filas por prioridade
-        self.queues = {
-            'high': deque(),
-            'normal': deque(),
-            'low': deque()
-        }
+        # Fila única de prioridade: heap de (prioridade, sequência, requisição)
+        # Sequência crescente mantém FIFO dentro da prioridade; a negativa
+        # coloca reenvios na frente, como um appendleft
+        self._pq = []
+        self._seq = itertools.count()
+        self._front_seq = itertools.count(-1, -1)
         
-        # Cache multi-nível
-        self.cache = {}
-        self.cache_ttl = {}
+        # Cache multi-nível: LRU de cache_key -> (expiração monotônica, valor)
+        # com heap de expirações para remover entradas vencidas em bloco
+        self.cache = OrderedDict()
+        self._cache_expiry = []
+        self._cache_lock = threading.Lock()
         self.persistent_cache = {}
         
         # Estatísticas avançadas
@@ -34,11 +74,19 @@ class SmartRequestQueueManager:
             'failed_requests': 0,
             'rate_limit_hits': 0,
             'avg_response_time': 0,
-            'queue_times': deque(maxlen=100)
+            'queue_times': deque()
         }
+        # Soma corrente da janela de tempos (média em O(1) por requisição)
+        self._queue_times_sum = 0.0
         
-        self.request_history = deque(maxlen=max_requests_per_minute)
-        self.lock = threading.Lock()
+        # Rate limit por token bucket: capacidade de um minuto de requisições,
+        # reabastecido continuamente à taxa por segundo
+        self._bucket = TokenBucket(max_requests_per_minute, max_requests_per_minute / 60.0)
+        self.lock = threading.RLock()
+        
+        # Pool para sobrepor a latência de rede das requisições (I/O-bound)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='request-queue')
         self.last_optimization = time.time()
         
     def add_request(self, request_id, request_func, priority='normal', 
@@ -60,7 +108,7 @@ class SmartRequestQueueManager:
         }
         
         with self.lock:
-            self.queues[priority].append(request_data)
+            heapq.heappush(self._pq, (PRIORITIES[priority], next(self._seq), request_data))
             self.stats['total_requests'] += 1
             
         return request_id
@@ -68,42 +116,50 @@ class SmartRequestQueueManager:
     def process_batch(self, batch_size=10, timeout=30):
         """
         Processa um lote de requisições de forma otimizada
+        
+        Requisições fora do cache são disparadas em paralelo no pool de
+        threads, respeitando o rate limit antes de cada envio.
         """
         start_time = time.time()
         processed = 0
         results = {}
+        pending = {}
         
-        while processed < batch_size and time.time() - start_time < timeout:
+        while processed + len(pending) < batch_size and time.time() - start_time < timeout:
             # Obter próxima requisição por prioridade
             request = self._get_next_request()
             if not request:
                 break
-                
-            try:
-                # Verificar cache primeiro
-                if request['cache_key']:
-                    cached = self.get_from_cache(request['cache_key'])
-                    if cached is not None:
-                        results[request['id']] = cached
-                        request['status'] = 'cached'
-                        processed += 1
-                        continue
-                
-                # Verificar rate limit
-                if not self._can_make_request():
-                    wait_time = self._calculate_wait_time()
-                    time.sleep(wait_time)
-                
-                # Executar requisição
-                request_start = time.time()
-                result = request['func'](*request['args'], **request['kwargs'])
-                request_time = time.time() - request_start
+            
+            # Verificar cache primeiro
+            if request['cache_key']:
+                cached = self.get_from_cache(request['cache_key'])
+                if cached is not None:
+                    results[request['id']] = cached
+                    request['status'] = 'cached'
+                    processed += 1
+                    continue
+            
+            # Verificar rate limit e reservar a vaga antes do envio
+            self._bucket.acquire()
+            
+            # Executar requisição no pool
+            future = self._executor.submit(_timed_call, request['func'],
+                                           request['args'], request['kwargs'])
+            pending[future] = request
+        
+        remaining_time = max(0, timeout - (time.time() - start_time))
+        try:
+            for future in as_completed(pending, timeout=remaining_time):
+                request = pending.pop(future)
+                try:
+                    result, request_time = future.result()
+                except Exception as e:
+                    self._reschedule_failed(request, e, results)
+                    continue
                 
                 # Atualizar estatísticas
-                self.stats['queue_times'].append(request_time)
-                self.stats['avg_response_time'] = (
-                    sum(self.stats['queue_times']) / len(self.stats['queue_times'])
-                )
+                self._record_response_time(request_time)
                 
                 # Cachear resultado
                 if request['cache_key']:
@@ -113,20 +169,12 @@ class SmartRequestQueueManager:
                 request['status'] = 'completed'
                 self.stats['completed_requests'] += 1
                 processed += 1
-                
-                # Registrar requisição
-                self.request_history.append(time.time())
-                
-            except Exception as e:
-                request['status'] = 'failed'
-                request['attempts'] += 1
-                self.stats['failed_requests'] += 1
-                
-                # Reagendar se tiver tentativas restantes
-                if request['attempts'] < 3:
-                    self.queues['low'].appendleft(request)
-                
-                results[request['id']] = {'error': str(e)}
+        except FuturesTimeoutError as e:
+            # Requisições que estouraram o tempo do lote contam como falha;
+            # as que ainda não saíram do pool são canceladas antes do reenvio
+            for future, request in pending.items():
+                future.cancel()
+                self._reschedule_failed(request, e, results)
         
         return {
             'results': results,
@@ -134,70 +182,149 @@ class SmartRequestQueueManager:
             'remaining': self.get_queue_size()
         }
     
+    def _reschedule_failed(self, request, error, results):
+        """Registra falha e reagenda se tiver tentativas restantes"""
+        request['status'] = 'failed'
+        request['attempts'] += 1
+        self.stats['failed_requests'] += 1
+        
+        if request['attempts'] < 3:
+            with self.lock:
+                heapq.heappush(self._pq, (PRIORITIES['low'], next(self._front_seq), request))
+        
+        results[request['id']] = {'error': str(error)}
+    
+    def execute_with_retry(self, request_func, cache_key=None, max_retries=None, ttl=300):
+        """
+        Executa uma requisição imediatamente, com cache e novas tentativas em 429
+        
+        Demais erros de rede/HTTP contam como falha e retornam None, como o
+        rate limit esgotado, para quem chamou mostrar a própria mensagem.
+        
+        Args:
+            request_func: Função sem argumentos que faz a requisição
+            cache_key: Chave do cache de respostas (opcional)
+            max_retries: Tentativas (padrão: API_RATE_LIMIT['max_retries'])
+            ttl: Validade em segundos do resultado no cache
+        
+        Returns:
+            Resultado da requisição ou None se falhar
+        """
+        if cache_key:
+            cached = self.get_from_cache(cache_key)
+            if cached is not None:
+                return cached
+        
+        if max_retries is None:
+            max_retries = API_RATE_LIMIT['max_retries']
+        self.stats['total_requests'] += 1
+        
+        for attempt in range(max_retries):
+            try:
+                result, request_time = _timed_call(request_func, (), {})
+            except requests.RequestException as e:
+                # Só rate limit é repetido; conexão, timeout e demais HTTP falham direto
+                response = getattr(e, 'response', None)
+                if response is None or response.status_code != 429:
+                    self.stats['failed_requests'] += 1
+                    return None
+                self.stats['rate_limit_hits'] += 1
+                if attempt < max_retries - 1:
+                    time.sleep(_retry_delay(response, attempt))
+                continue
+            
+            self._record_response_time(request_time)
+            if cache_key:
+                self.set_cache(cache_key, result, ttl)
+            self.stats['completed_requests'] += 1
+            return result
+        
+        self.stats['failed_requests'] += 1
+        return None
+    
+    def _record_response_time(self, request_time):
+        """Atualiza a média móvel dos tempos de resposta incrementalmente"""
+        queue_times = self.stats['queue_times']
+        if len(queue_times) >= RESPONSE_TIME_WINDOW:
+            self._queue_times_sum -= queue_times.popleft()
+        queue_times.append(request_time)
+        self._queue_times_sum += request_time
+        self.stats['avg_response_time'] = self._queue_times_sum / len(queue_times)
+    
     def _get_next_request(self):
         """Obtém próxima requisição por prioridade"""
         with self.lock:
-            for priority in ['high', 'normal', 'low']:
-                if self.queues[priority]:
-                    return self.queues[priority].popleft()
+            if self._pq:
+                return heapq.heappop(self._pq)[2]
         return None
     
     def _can_make_request(self):
         """Verifica se pode fazer nova requisição"""
-        current_time = time.time()
-        
-        # Limpar histórico antigo
-        while (self.request_history and 
-               current_time - self.request_history[0] > 60):
-            self.request_history.popleft()
-        
-        return len(self.request_history) < self.max_requests_per_minute
+        # Caminho rápido sem lock: tokens só diminuem ao consumir
+        if self._bucket.tokens >= 1:
+            return True
+        return self._bucket.available() >= 1
     
     def _calculate_wait_time(self):
         """Calcula tempo de espera otimizado"""
-        if not self.request_history:
-            return 0
-        
-        current_time = time.time()
-        oldest_request = self.request_history[0]
-        
-        time_until_reset = 60 - (current_time - oldest_request)
-        return max(0, time_until_reset + 0.1)
+        missing_tokens = 1 - self._bucket.available()
+        return max(0, missing_tokens / self._bucket.refill_rate)
     
     def get_from_cache(self, cache_key):
         """Obtém do cache com TTL"""
-        if cache_key in self.cache:
-            cache_time = self.cache_ttl.get(cache_key, 0)
-            if time.time() - cache_time < self.cache_ttl.get(f"{cache_key}_ttl", 300):
-                self.stats['cached_responses'] += 1
-                return self.cache[cache_key]
-            else:
+        with self._cache_lock:
+            entry = self.cache.get(cache_key)
+            if entry is None:
+                return None
+            
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
                 del self.cache[cache_key]
-                del self.cache_ttl[cache_key]
-                del self.cache_ttl[f"{cache_key}_ttl"]
-        
-        return None
+                return None
+            
+            # Entrada usada recentemente vai para o fim da fila LRU
+            self.cache.move_to_end(cache_key)
+            self.stats['cached_responses'] += 1
+            return value
     
     def set_cache(self, cache_key, value, ttl=300):
         """Armazena no cache com TTL"""
-        self.cache[cache_key] = value
-        self.cache_ttl[cache_key] = time.time()
-        self.cache_ttl[f"{cache_key}_ttl"] = ttl
+        now = time.monotonic()
+        expires_at = now + ttl
+        
+        with self._cache_lock:
+            self.cache[cache_key] = (expires_at, value)
+            self.cache.move_to_end(cache_key)
+            heapq.heappush(self._cache_expiry, (expires_at, cache_key))
+            
+            self._evict_expired(now)
+            
+            # Limite de tamanho: descartar as menos usadas
+            while len(self.cache) > self.max_cache_size:
+                self.cache.popitem(last=False)
+    
+    def _evict_expired(self, now):
+        """Remove entradas vencidas usando o heap de expirações (chamar com _cache_lock)"""
+        while self._cache_expiry and self._cache_expiry[0][0] <= now:
+            expires_at, cache_key = heapq.heappop(self._cache_expiry)
+            
+            # Ignorar registros de chaves já regravadas ou removidas
+            entry = self.cache.get(cache_key)
+            if entry is not None and entry[0] == expires_at:
+                del self.cache[cache_key]
     
     def get_queue_size(self):
         """Retorna tamanho total da fila"""
-        return sum(len(queue) for queue in self.queues.values())
+        return len(self._pq)
     
     def get_status(self):
         """Status detalhado do gerenciador"""
-        current_time = time.time()
-        
-        # Limpar histórico
-        while (self.request_history and 
-               current_time - self.request_history[0] > 60):
-            self.request_history.popleft()
-        
-        queue_sizes = {priority: len(queue) for priority, queue in self.queues.items()}
+        queue_sizes = dict.fromkeys(PRIORITIES, 0)
+        with self.lock:
+            # Tokens ainda não reabastecidos equivalem às requisições do último minuto
+            requests_last_minute = int(self.max_requests_per_minute - self._bucket.available())
+            for entry in self._pq:
+                queue_sizes[entry[2]['priority']] += 1
         
         return {
             'queues': queue_sizes,
@@ -206,7 +333,7 @@ class SmartRequestQueueManager:
             'failed': self.stats['failed_requests'],
             'cached': self.stats['cached_responses'],
             'rate_limit_hits': self.stats['rate_limit_hits'],
-            'requests_last_minute': len(self.request_history),
+            'requests_last_minute': requests_last_minute,
             'cache_size': len(self.cache),
             'avg_response_time': self.stats['avg_response_time'],
             'efficiency': (self.stats['cached_responses'] / 
@@ -216,13 +343,17 @@ class SmartRequestQueueManager:
     def optimize_queues(self):
         """Otimiza as filas removendo duplicatas"""
         with self.lock:
-            for priority in self.queues:
-                unique_requests = {}
-                for request in self.queues[priority]:
-                    request_key = f"{request['id']}_{request.get('cache_key', '')}"
-                    unique_requests[request_key] = request
-                
-                self.queues[priority] = deque(unique_requests.values())
+            # Mesma requisição na mesma prioridade: mantém a posição da
+            # primeira ocorrência com os dados da última
+            unique_requests = {}
+            for rank, seq, request in sorted(self._pq, key=lambda entry: entry[:2]):
+                request_key = (rank, f"{request['id']}_{request.get('cache_key', '')}")
+                if request_key in unique_requests:
+                    rank, seq, _ = unique_requests[request_key]
+                unique_requests[request_key] = (rank, seq, request)
+            
+            self._pq = list(unique_requests.values())
+            heapq.heapify(self._pq)
     
     def auto_adjust_rates(self):
         """Ajusta automaticamente as taxas baseado no desempenho"""
@@ -1,5 +1,16 @@
 import pandas as pd
 import numpy as np
+from data.config import RISK, RISK_LEVELS
+
+# Faixas de RISK_LEVELS para busca binária: limites inferiores de cada faixa
+# seguidos do limite superior da última
+RISK_LABELS = np.array(RISK_LEVELS.labels)
+RISK_BOUNDARIES = np.array(RISK_LEVELS.boundaries, dtype=np.float32)
+
+# Pesos de RISK_CONFIG em float32: a combinação dos scores não promove a float64
+VOLATILITY_WEIGHT = np.float32(RISK.volatility_weight)
+LIQUIDITY_WEIGHT = np.float32(RISK.liquidity_weight)
+MARKET_SIZE_WEIGHT = np.float32(RISK.market_size_weight)
 
 def calculate_risk_score(df):
     """
@@ -10,83 +21,119 @@ def calculate_risk_score(df):
         df (pandas.DataFrame): DataFrame com dados das moedas
         
     Returns:
-        pandas.DataFrame: DataFrame com coluna 'risk_score' adicionada
+        pandas.DataFrame: DataFrame com colunas 'risk_score' e 'risk_level' adicionadas
     """
-    df = df.copy()
+    # Cópia rasa: as colunas tratadas abaixo são substituídas, não alteradas in-place
+    df = df.copy(deep=False)
     
     # Normalizar e tratar valores missing
     df['price_change_percentage_24h'] = df['price_change_percentage_24h'].fillna(0)
     df['total_volume'] = df['total_volume'].fillna(0)
     df['market_cap'] = df['market_cap'].fillna(1)  # Evitar divisão por zero
     
+    # Arrays float32 extraídos uma vez e reaproveitados pelos três componentes
+    price_change = df['price_change_percentage_24h'].to_numpy(dtype=np.float32)
+    total_volume = df['total_volume'].to_numpy(dtype=np.float32)
+    market_cap = df['market_cap'].to_numpy(dtype=np.float32)
+    
     # 1. Volatilidade (40% do score)
-    volatility_score = calculate_volatility_score(df)
+    volatility_score = calculate_volatility_score(price_change)
     
     # 2. Liquidez - Volume/MarketCap Ratio (30% do score)
-    liquidity_score = calculate_liquidity_score(df)
+    liquidity_score = calculate_liquidity_score(total_volume, market_cap)
     
     # 3. Tamanho do Mercado - Market Cap (30% do score)
-    market_size_score = calculate_market_size_score(df)
+    market_size_score = calculate_market_size_score(market_cap)
     
     # Combinar scores com pesos
     risk_score = (
-        volatility_score * 0.4 +
-        liquidity_score * 0.3 +
-        market_size_score * 0.3
+        volatility_score * VOLATILITY_WEIGHT +
+        liquidity_score * LIQUIDITY_WEIGHT +
+        market_size_score * MARKET_SIZE_WEIGHT
     )
     
     # Garantir que o score está entre 0-100
     df['risk_score'] = np.clip(risk_score, 0, 100).round(1)
+    df['risk_level'] = pd.Categorical(classify_risk(df['risk_score'].to_numpy()),
+                                      categories=RISK_LABELS, ordered=True)
     
     return df
 
-def calculate_volatility_score(df):
+def classify_risk(scores):
+    """
+    Faixa de risco (RISK_LEVELS) de cada score em uma busca binária
+    
+    Args:
+        scores (numpy.ndarray): Scores de risco 0-100
+        
+    Returns:
+        numpy.ndarray: Nome da faixa de cada score
+    """
+    idx = np.searchsorted(RISK_BOUNDARIES, scores, side='right') - 1
+    return RISK_LABELS[np.clip(idx, 0, len(RISK_LABELS) - 1)]
+
+def _max_value(values):
+    """Máximo ignorando NaN (como Series.max); NaN se não houver valores"""
+    valid = values[~np.isnan(values)]
+    return valid.max() if len(valid) else np.nan
+
+def calculate_volatility_score(price_change):
     """
     Calcula score baseado na volatilidade (mudança percentual 24h)
     Quanto maior a volatilidade, maior o risco
+    
+    Args:
+        price_change (numpy.ndarray): Variação percentual 24h de cada moeda
     """
-    price_change = df['price_change_percentage_24h'].abs()
+    price_change = np.abs(price_change)
     
     # Normalizar para 0-100
-    max_volatility = price_change.max()
+    max_volatility = _max_value(price_change)
     if max_volatility > 0:
         volatility_score = (price_change / max_volatility) * 100
     else:
-        volatility_score = pd.Series([0] * len(df))
+        volatility_score = np.zeros(len(price_change), dtype=np.float32)
     
     return volatility_score
 
-def calculate_liquidity_score(df):
+def calculate_liquidity_score(total_volume, market_cap):
     """
     Calcula score baseado na liquidez (Volume/MarketCap)
     Quanto menor a liquidez, maior o risco
+    
+    Args:
+        total_volume (numpy.ndarray): Volume 24h de cada moeda
+        market_cap (numpy.ndarray): Market cap de cada moeda
     """
     # Calcular ratio volume/market_cap
-    volume_ratio = df['total_volume'] / df['market_cap']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume_ratio = total_volume / market_cap
     
     # Inverter: menor liquidez = maior risco
     # Normalizar para 0-100
-    max_ratio = volume_ratio.max()
+    max_ratio = _max_value(volume_ratio)
     if max_ratio > 0:
-        liquidity_risk = (1 - (volume_ratio / max_ratio)) * 100
+        with np.errstate(invalid='ignore'):
+            liquidity_risk = (1 - (volume_ratio / max_ratio)) * 100
     else:
-        liquidity_risk = pd.Series([100] * len(df))  # Máximo risco se não há volume
+        liquidity_risk = np.full(len(volume_ratio), 100.0, dtype=np.float32)  # Máximo risco se não há volume
     
     return liquidity_risk
 
-def calculate_market_size_score(df):
+def calculate_market_size_score(market_cap):
     """
     Calcula score baseado no market cap
     Quanto menor o market cap, maior o risco
-    """
-    market_cap = df['market_cap']
     
+    Args:
+        market_cap (numpy.ndarray): Market cap de cada moeda
+    """
     # Inverter: menor market cap = maior risco
     # Normalizar para 0-100
-    max_mcap = market_cap.max()
+    max_mcap = _max_value(market_cap)
     if max_mcap > 0:
         size_risk = (1 - (market_cap / max_mcap)) * 100
     else:
-        size_risk = pd.Series([100] * len(df))
+        size_risk = np.full(len(market_cap), 100.0, dtype=np.float32)
     
     return size_risk
\ No newline at end of file
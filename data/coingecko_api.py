@@ -1,9 +1,34 @@
-import requests
 import pandas as pd
 import streamlit as st
 from datetime import datetime, timedelta
 import time
 from queue_manager import get_request_manager
+from utils.http_session import create_http_session, get_history, record_volatility
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Conexões simultâneas mantidas com a CoinGecko (cobre o pool da fila)
+HTTP_POOL_SIZE = 10
+
+# Colunas de mercado armazenadas em float32. Preço, volume e market cap ficam
+# em float64: são exibidos com todos os dígitos nos cards e na tabela
+FLOAT32_COLUMNS = [
+    'high_24h', 'low_24h', 'price_change_24h', 'price_change_percentage_24h',
+    'price_change_percentage_7d', 'price_change_percentage_30d'
+]
+
+# Sessão compartilhada: keep-alive reaproveita a conexão TCP/TLS entre chamadas
+# e o cache HTTP em disco (requests-cache) evita refazer requisições recentes
+_session = create_http_session(HTTP_POOL_SIZE)
+
+def _decode_json(response):
+    """Decodifica o corpo da resposta (orjson quando instalado)"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
 
 @st.cache_data(ttl=300)
 def get_top_coins_via_queue():
@@ -23,9 +48,9 @@ def get_top_coins_via_queue():
             'price_change_percentage': '24h,7d,30d'
         }
         
-        response = requests.get(url, params=params, timeout=15)
+        response = _session.get(url, params=params, timeout=15)
         response.raise_for_status()
-        return response.json()
+        return _decode_json(response)
     
     # Usar fila com alta prioridade
     result = queue_manager.execute_with_retry(
@@ -61,6 +86,14 @@ def get_top_coins_via_queue():
         
         if 'id' not in df.columns:
             df['id'] = df['coin_id']
+        
+        # Reduzir colunas numéricas para float32 uma vez na entrada
+        df = df.astype({col: 'float32' for col in FLOAT32_COLUMNS if col in df.columns})
+        
+        # Amplitude 24h de cada moeda define o TTL do cache do seu histórico
+        if {'high_24h', 'low_24h', 'current_price'} <= set(df.columns):
+            range_pct = (df['high_24h'] - df['low_24h']) / df['current_price'] * 100
+            record_volatility(df['coin_id'], range_pct.to_numpy(dtype=float))
             
         return df
     
@@ -83,9 +116,9 @@ def get_historical_data_optimized(coin_id, days=30, queue_manager=None):
             'interval': 'hourly' if days <= 7 else 'daily'
         }
         
-        response = requests.get(url, params=params, timeout=20)
+        response = get_history(_session, url, coin_id, params=params, timeout=20)
         response.raise_for_status()
-        return response.json()
+        return _decode_json(response)
     
     data = queue_manager.execute_with_retry(
         fetch_historical, cache_key, max_retries=2
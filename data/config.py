@@ -3,23 +3,40 @@ Configurações centralizadas do Crypto Risk Analyzer
 Ajuste estes valores conforme necessário
 """
 
+from dataclasses import asdict, dataclass, field
+from types import MappingProxyType
+from typing import NamedTuple
+
+import numpy as np
+
 # ============================================================
 # CONFIGURAÇÕES DA API COINGECKO
 # ============================================================
 
 # Rate Limiting
 API_RATE_LIMIT = {
-    'min_interval': 1.5,        # Segundos entre requisições
+    'algorithm': 'gcra',        # 'gcra', 'token_bucket' ou 'min_interval'
+    'min_interval': 1.5,        # Segundos entre requisições (algoritmo 'min_interval')
     'max_retries': 3,            # Número máximo de tentativas
     'retry_wait': 60,            # Segundos de espera após rate limit
     'progressive_wait': True     # Aumentar tempo de espera a cada retry
 }
 
+# GCRA: `limit` requisições por `period` segundos, rajadas de até `burst`
+GCRA_CONFIG = {
+    'period': 60.0,
+    'limit': 50,
+    'burst': 5                   # Rajada curta: ~limit+burst no primeiro minuto
+}
+
 # Cache
 API_CACHE = {
     'coins_list_ttl': 300,       # 5 minutos para lista de moedas
     'coin_history_ttl': 600,     # 10 minutos para histórico
-    'indicators_ttl': 600        # 10 minutos para indicadores
+    'indicators_ttl': 600,       # 10 minutos para indicadores
+    'http_cache_path': 'cache/coingecko_http',  # Cache HTTP em SQLite (requests-cache)
+    'stale_while_revalidate': 30,  # Segundos servindo resposta vencida enquanto renova
+    'adaptive': True             # TTL do histórico pela volatilidade de cada moeda
 }
 
 # Limites de requisições
@@ -33,35 +50,67 @@ API_LIMITS = {
 # CONFIGURAÇÕES DE ANÁLISE
 # ============================================================
 
+# Seções imutáveis: lidas por atributo (MA.period) no código de cálculo e
+# expostas também como mapeamento somente leitura (MA_CONFIG['period']).
+# Valores inválidos falham já na construção (ValueError)
+
 # Médias Móveis
-MA_CONFIG = {
-    'enabled': True,
-    'timeframe': '4h',           # Apenas 4h para otimização
-    'period': 200,               # Período da MA
-    'max_coins': 15,             # Limitar análise às top N moedas
-    'proximity_threshold': 2.0,  # % para considerar "próximo" da MA
-    'analysis_candles': 3        # Número de candles para verificar toque
-}
+@dataclass(frozen=True, slots=True)
+class MAConfig:
+    enabled: bool = True
+    timeframe: str = '4h'             # Apenas 4h para otimização
+    period: int = 200                 # Período da MA
+    max_coins: int = 15               # Limitar análise às top N moedas
+    proximity_threshold: float = 2.0  # % para considerar "próximo" da MA
+    analysis_candles: int = 3         # Número de candles para verificar toque
+
+    def __post_init__(self):
+        if self.period < 2 or self.max_coins < 1 or self.analysis_candles < 1:
+            raise ValueError("MAConfig: period >= 2, max_coins >= 1 e analysis_candles >= 1")
+        if self.proximity_threshold < 0:
+            raise ValueError("MAConfig: proximity_threshold não pode ser negativo")
 
 # Indicadores de Momentum
-MOMENTUM_CONFIG = {
-    'enabled': True,
-    'rsi_period': 14,
-    'macd_fast': 12,
-    'macd_slow': 26,
-    'macd_signal': 9,
-    'stochastic_period': 14,
-    'stochastic_smooth': 3
-}
+@dataclass(frozen=True, slots=True)
+class MomentumConfig:
+    enabled: bool = True
+    rsi_period: int = 14
+    macd_fast: int = 12
+    macd_slow: int = 26
+    macd_signal: int = 9
+    stochastic_period: int = 14
+    stochastic_smooth: int = 3
+
+    def __post_init__(self):
+        periods = (self.rsi_period, self.macd_fast, self.macd_slow, self.macd_signal,
+                   self.stochastic_period, self.stochastic_smooth)
+        if min(periods) < 1:
+            raise ValueError("MomentumConfig: períodos devem ser >= 1")
+        if self.macd_fast >= self.macd_slow:
+            raise ValueError("MomentumConfig: macd_fast deve ser menor que macd_slow")
 
 # Indicadores de Volatilidade
-VOLATILITY_CONFIG = {
-    'enabled': True,
-    'atr_period': 14,
-    'bb_period': 20,
-    'bb_std_dev': 2,
-    'historical_vol_period': 30
-}
+@dataclass(frozen=True, slots=True)
+class VolatilityConfig:
+    enabled: bool = True
+    atr_period: int = 14
+    bb_period: int = 20
+    bb_std_dev: float = 2
+    historical_vol_period: int = 30
+
+    def __post_init__(self):
+        if min(self.atr_period, self.bb_period, self.historical_vol_period) < 2:
+            raise ValueError("VolatilityConfig: períodos devem ser >= 2")
+        if self.bb_std_dev <= 0:
+            raise ValueError("VolatilityConfig: bb_std_dev deve ser positivo")
+
+MA = MAConfig()
+MOMENTUM = MomentumConfig()
+VOLATILITY = VolatilityConfig()
+
+MA_CONFIG = MappingProxyType(asdict(MA))
+MOMENTUM_CONFIG = MappingProxyType(asdict(MOMENTUM))
+VOLATILITY_CONFIG = MappingProxyType(asdict(VOLATILITY))
 
 # Volume Profile
 VOLUME_CONFIG = {
@@ -74,26 +123,56 @@ VOLUME_CONFIG = {
 # CONFIGURAÇÕES DE RISCO
 # ============================================================
 
-RISK_CONFIG = {
-    'volatility_weight': 0.4,    # 40% do score
-    'liquidity_weight': 0.3,     # 30% do score
-    'market_size_weight': 0.3,   # 30% do score
-    'risk_levels': {
-        'very_low': (0, 20),
-        'low': (20, 40),
-        'moderate': (40, 60),
-        'high': (60, 80),
-        'very_high': (80, 100)
-    }
-}
+class RiskLevels(NamedTuple):
+    """Faixas de risco: labels[i] cobre [boundaries[i], boundaries[i + 1])"""
+    boundaries: tuple = (0, 20, 40, 60, 80, 100)
+    labels: tuple = ('very_low', 'low', 'moderate', 'high', 'very_high')
+
+    def as_dict(self) -> MappingProxyType:
+        """Formato antigo {nível: (mínimo, máximo)} de RISK_CONFIG['risk_levels']"""
+        return MappingProxyType({label: (low, high) for label, low, high
+                                 in zip(self.labels, self.boundaries, self.boundaries[1:])})
+
+RISK_LEVELS = RiskLevels()
+
+@dataclass(frozen=True, slots=True)
+class RiskConfig:
+    volatility_weight: float = 0.4    # 40% do score
+    liquidity_weight: float = 0.3     # 30% do score
+    market_size_weight: float = 0.3   # 30% do score
+    # Compatibilidade: novos usos devem ler RISK_LEVELS
+    risk_levels: MappingProxyType = field(default_factory=RISK_LEVELS.as_dict)
+
+RISK = RiskConfig()
+# Os pesos são fixos (RISK não é atualizável em runtime): soma calculada uma vez
+_RISK_WEIGHT_SUM = RISK.volatility_weight + RISK.liquidity_weight + RISK.market_size_weight
+RISK_CONFIG = MappingProxyType({name: getattr(RISK, name) for name in RiskConfig.__slots__})
 
 # Alavancagem
 LEVERAGE_CONFIG = {
     'max_leverage': 10,
-    'min_leverage': 1,
-    'formula': lambda risk: max(1, 10 - (risk / 10))
+    'min_leverage': 1
 }
 
+# Alavancagem pré-calculada para cada score de 0 a 100 em passos de 0.1
+# (resolução do risk_score): leverage = max(1, 10 - (risco / 10))
+_LEVERAGE_RISKS = (np.arange(1001) / 10).astype(np.float32)
+LEVERAGE_LUT = np.maximum(LEVERAGE_CONFIG['min_leverage'],
+                          LEVERAGE_CONFIG['max_leverage'] - _LEVERAGE_RISKS / 10).round(1)
+LEVERAGE_LUT.setflags(write=False)
+
+def leverage_for(scores):
+    """
+    Alavancagem sugerida para um score ou array de scores de risco (0-100)
+    
+    Consulta LEVERAGE_LUT com o score arredondado a 0.1; NaN continua NaN.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    idx = np.clip(np.rint(np.nan_to_num(scores) * 10), 0, 1000).astype(np.intp)
+    return np.where(np.isnan(scores), np.nan, LEVERAGE_LUT[idx]).astype(np.float32)[()]
+
+LEVERAGE_CONFIG['formula'] = leverage_for
+
 # ============================================================
 # CONFIGURAÇÕES DE INTERFACE
 # ============================================================
@@ -134,17 +213,21 @@ PERFORMANCE_CONFIG = {
     'enable_status_messages': True,
     'enable_warnings': True,
     'enable_info_messages': True,
-    'parallel_processing': False  # Não implementado ainda
+    'parallel_processing': True   # Kernels numba (prange) em todos os núcleos
 }
 
 # ============================================================
 # MENSAGENS E TEXTOS
 # ============================================================
 
+def _calculating_ma_message(ma: MAConfig) -> str:
+    """Mensagem da análise de médias já interpolada com a configuração de MA"""
+    return f"📊 Analisando Médias Móveis ({ma.timeframe} - Top {ma.max_coins})..."
+
 MESSAGES = {
     'loading': "📡 Carregando dados da CoinGecko...",
     'calculating_risk': "🧮 Calculando métricas de risco...",
-    'calculating_ma': "📊 Analisando Médias Móveis (4h - Top {n})...",
+    'calculating_ma': _calculating_ma_message(MA),
     'calculating_momentum': "⚡ Calculando indicadores de Momentum...",
     'calculating_volatility': "📉 Calculando indicadores de Volatilidade...",
     'success': "✅ Dados carregados com sucesso!",
@@ -233,6 +316,33 @@ HELP_TEXTS = {
 # FUNÇÕES AUXILIARES
 # ============================================================
 
+# Seção -> nome da variável do módulo com a configuração
+_CONFIG_SECTIONS = {
+    'api_rate_limit': 'API_RATE_LIMIT',
+    'gcra': 'GCRA_CONFIG',
+    'api_cache': 'API_CACHE',
+    'api_limits': 'API_LIMITS',
+    'ma': 'MA_CONFIG',
+    'momentum': 'MOMENTUM_CONFIG',
+    'volatility': 'VOLATILITY_CONFIG',
+    'volume': 'VOLUME_CONFIG',
+    'risk': 'RISK_CONFIG',
+    'leverage': 'LEVERAGE_CONFIG',
+    'dashboard': 'DASHBOARD_CONFIG',
+    'theme': 'THEME_COLORS',
+    'filters': 'DEFAULT_FILTERS',
+    'performance': 'PERFORMANCE_CONFIG'
+}
+
+# Seção -> objeto de configuração, montado uma vez. Os valores são lidos
+# direto da seção, então alterações em runtime aparecem em get_config
+_CONFIG_MAP = {}
+
+def _build_config_tables():
+    """Monta a tabela de consulta de get_config a partir das seções atuais"""
+    _CONFIG_MAP.clear()
+    _CONFIG_MAP.update({section: globals()[name] for section, name in _CONFIG_SECTIONS.items()})
+
 def get_config(section: str, key: str = None):
     """
     Retorna configuração específica
@@ -241,47 +351,33 @@ def get_config(section: str, key: str = None):
         section: Nome da seção (ex: 'API_RATE_LIMIT')
         key: Chave específica (opcional)
     """
-    config_map = {
-        'api_rate_limit': API_RATE_LIMIT,
-        'api_cache': API_CACHE,
-        'api_limits': API_LIMITS,
-        'ma': MA_CONFIG,
-        'momentum': MOMENTUM_CONFIG,
-        'volatility': VOLATILITY_CONFIG,
-        'volume': VOLUME_CONFIG,
-        'risk': RISK_CONFIG,
-        'leverage': LEVERAGE_CONFIG,
-        'dashboard': DASHBOARD_CONFIG,
-        'theme': THEME_COLORS,
-        'filters': DEFAULT_FILTERS,
-        'performance': PERFORMANCE_CONFIG
-    }
-    
-    section_config = config_map.get(section.lower())
+    section_config = _CONFIG_MAP.get(section.lower())
     
     if key:
-        return section_config.get(key) if section_config else None
+        return section_config.get(key) if section_config is not None else None
     return section_config
 
 def update_config(section: str, key: str, value):
     """
     Atualiza configuração em runtime
     
+    Só as seções mutáveis (rate limit, cache e dashboard) aceitam mudanças;
+    MA, momentum e volatilidade são imutáveis e retornam False.
+    
     Args:
         section: Nome da seção
         key: Chave a atualizar
         value: Novo valor
     """
+    section = section.lower()
+    
     config_map = {
         'api_rate_limit': API_RATE_LIMIT,
         'api_cache': API_CACHE,
-        'ma': MA_CONFIG,
-        'momentum': MOMENTUM_CONFIG,
-        'volatility': VOLATILITY_CONFIG,
         'dashboard': DASHBOARD_CONFIG
     }
     
-    section_config = config_map.get(section.lower())
+    section_config = config_map.get(section)
     if section_config and key in section_config:
         section_config[key] = value
         return True
@@ -294,28 +390,28 @@ def update_config(section: str, key: str, value):
 def validate_config():
     """
     Valida configurações ao iniciar
-    """
-    errors = []
     
+    Gera as mensagens de erro uma a uma: `next(validate_config(), None)`
+    para só o primeiro erro, `list(validate_config())` para todos
+    """
     # Validar rate limit
     if API_RATE_LIMIT['min_interval'] < 0.5:
-        errors.append("min_interval muito baixo (mínimo 0.5s)")
+        yield "min_interval muito baixo (mínimo 0.5s)"
+    if API_RATE_LIMIT['algorithm'] not in ('gcra', 'token_bucket', 'min_interval'):
+        yield f"Algoritmo de rate limit desconhecido: {API_RATE_LIMIT['algorithm']}"
     
     # Validar MA config
-    if MA_CONFIG['max_coins'] > 30:
-        errors.append("max_coins muito alto (máximo recomendado: 30)")
+    if MA.max_coins > 30:
+        yield "max_coins muito alto (máximo recomendado: 30)"
     
     # Validar pesos de risco
-    total_weight = (RISK_CONFIG['volatility_weight'] + 
-                   RISK_CONFIG['liquidity_weight'] + 
-                   RISK_CONFIG['market_size_weight'])
-    if abs(total_weight - 1.0) > 0.01:
-        errors.append(f"Pesos de risco não somam 1.0 (atual: {total_weight})")
-    
-    return errors
+    if abs(_RISK_WEIGHT_SUM - 1.0) > 0.01:
+        yield f"Pesos de risco não somam 1.0 (atual: {_RISK_WEIGHT_SUM})"
+
+_build_config_tables()
 
 # Validar ao importar
-_config_errors = validate_config()
+_config_errors = list(validate_config())
 if _config_errors:
     print("⚠️ Avisos de configuração:")
     for error in _config_errors:
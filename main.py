@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from data.coingecko_api import get_top_coins, get_historical_data_optimized
@@ -12,9 +11,19 @@ from analysis.indicators.momentum_indicators import calculate_momentum_indicator
 from analysis.indicators.volatility_indicators import calculate_volatility_indicators
 from analysis.advanced_indicators import calculate_advanced_indicators
 from analysis.queue_manager import SmartRequestQueueManager, get_request_manager
+from data.config import API_CACHE
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 import numpy as np
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+try:
+    from streamlit_autorefresh import st_autorefresh
+except ImportError:
+    st_autorefresh = None
 
 # Configuração da página ultra moderna
 st.set_page_config(
@@ -29,7 +38,7 @@ if 'queue_manager' not in st.session_state:
     st.session_state.queue_manager = get_request_manager()
 
 # CSS customizado ultra moderno atualizado
-st.markdown("""
+_CSS = """
 <style>
     .main-header {
         font-size: 4rem;
@@ -106,7 +115,11 @@ st.markdown("""
         50% { box-shadow: 0 0 30px rgba(255, 193, 7, 0.8); }
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Reenviado a cada rerun: o Streamlit remove da página os elementos que o
+# script não emitiu na execução atual, então o estilo sumiria após o primeiro
+st.markdown(_CSS, unsafe_allow_html=True)
 
 def create_advanced_gauge_chart(value, title, max_value=100, thresholds=None):
     """Cria gráfico de gauge avançado com múltiplas zonas"""
@@ -146,141 +159,278 @@ def create_advanced_gauge_chart(value, title, max_value=100, thresholds=None):
     )
     return fig
 
-def generate_advanced_trading_signal(row):
-    """Gera sinal de trading ultra avançado com múltiplos fatores"""
-    score = 0
-    signals = []
-    weights = {
-        'risk': 0.15,
-        'ma': 0.25,
-        'rsi': 0.20,
-        'macd': 0.15,
-        'volume': 0.15,
-        'volatility': 0.10
-    }
+# Pesos de cada fator no score do sinal de trading
+SIGNAL_WEIGHTS = {
+    'risk': 0.15,
+    'ma': 0.25,
+    'rsi': 0.20,
+    'macd': 0.15,
+    'volume': 0.15,
+    'volatility': 0.10
+}
+
+# Faixas do score final: score >= SIGNAL_THRESHOLDS[i - 1] cai na faixa i
+SIGNAL_THRESHOLDS = np.array([30, 45, 65, 80])
+SIGNAL_LABELS = np.array(["🚨 FORTE VENDA", "🔴 VENDA", "⚪ NEUTRO", "🟢 COMPRA", "🚀 FORTE COMPRA"])
+SIGNAL_COLORS = np.array(["strong-sell", "sell", "neutral", "buy", "strong-buy"])
+SIGNAL_CONFIDENCES = np.array(["MUITO ALTA", "ALTA", "MÉDIA", "ALTA", "MUITO ALTA"])
+
+# Colunas de sinal como categóricas (códigos int8 no lugar de strings repetidas)
+SIGNAL_DTYPE = pd.CategoricalDtype(SIGNAL_LABELS, ordered=True)
+SIGNAL_COLOR_DTYPE = pd.CategoricalDtype(SIGNAL_COLORS)
+CONFIDENCE_DTYPE = pd.CategoricalDtype(["MÉDIA", "ALTA", "MUITO ALTA"], ordered=True)
+
+# Sinal de MA -> (pontos, razão); o regex tenta as variantes FORTE primeiro
+MA_SIGNAL_PATTERN = r'(FORTE COMPRA|FORTE VENDA|COMPRA|VENDA)'
+MA_SIGNAL_SCORES = {'FORTE COMPRA': 100, 'COMPRA': 75, 'FORTE VENDA': 0, 'VENDA': 25}
+MA_SIGNAL_REASONS = {
+    'FORTE COMPRA': "📈 MA: Forte Compra",
+    'COMPRA': "📈 MA: Compra",
+    'FORTE VENDA': "📉 MA: Forte Venda",
+    'VENDA': "📉 MA: Venda"
+}
+
+# Colunas usadas pelos sinais e pelos cards, com o valor neutro de cada uma
+# quando o indicador não foi calculado
+SIGNAL_COLUMN_DEFAULTS = {
+    'risk_score': 50.0,
+    'ma_signal': None,
+    'rsi': np.nan,
+    'macd_signal': None,
+    'volume_spike': 1.0,
+    'atr_pct': np.nan,
+    'ma_touched': False,
+    'ma_touch_details': 'MA Touch',
+    'ma_distance_pct': 0.0,
+    'market_cap_rank': 'N/A'
+}
+
+def _signal_factors(df):
+    """
+    Avalia cada fator do sinal de uma vez sobre a coluna inteira
+    
+    Args:
+        df (pandas.DataFrame): DataFrame com as colunas de SIGNAL_COLUMN_DEFAULTS
+        
+    Yields:
+        tuple: (pontos do fator já ponderados, condições, motivo de cada condição)
+    """
+    weights = SIGNAL_WEIGHTS
     
     # Score baseado em risco (invertido)
-    risk_score = row.get('risk_score', 50)
-    risk_component = max(0, 100 - risk_score) * weights['risk']
-    score += risk_component
-    
-    if risk_score < 25:
-        signals.append("🎯 Risco Muito Baixo")
-    elif risk_score < 40:
-        signals.append("✅ Risco Baixo")
-    elif risk_score > 75:
-        signals.append("🚨 Risco Muito Alto")
-    elif risk_score > 60:
-        signals.append("⚠️ Risco Alto")
-    
-    # Score baseado em MA
-    if 'ma_signal' in row and pd.notna(row['ma_signal']):
-        ma_signal = str(row['ma_signal'])
-        if 'FORTE COMPRA' in ma_signal:
-            score += 100 * weights['ma']
-            signals.append("📈 MA: Forte Compra")
-        elif 'COMPRA' in ma_signal:
-            score += 75 * weights['ma']
-            signals.append("📈 MA: Compra")
-        elif 'FORTE VENDA' in ma_signal:
-            score += 0 * weights['ma']
-            signals.append("📉 MA: Forte Venda")
-        elif 'VENDA' in ma_signal:
-            score += 25 * weights['ma']
-            signals.append("📉 MA: Venda")
+    risk_score = df['risk_score'].to_numpy(dtype=float)
+    yield (np.fmax(0, 100 - risk_score) * weights['risk'],
+           [risk_score < 25, risk_score < 40, risk_score > 75, risk_score > 60],
+           ["🎯 Risco Muito Baixo", "✅ Risco Baixo", "🚨 Risco Muito Alto", "⚠️ Risco Alto"])
+    
+    # Score baseado em MA (um único regex sobre a coluna)
+    ma_kind = df['ma_signal'].astype(str).str.extract(MA_SIGNAL_PATTERN, expand=False)
+    kinds = ma_kind.to_numpy(dtype=object)
+    yield (ma_kind.map(MA_SIGNAL_SCORES).fillna(0).to_numpy() * weights['ma'],
+           [kinds == kind for kind in MA_SIGNAL_REASONS],
+           list(MA_SIGNAL_REASONS.values()))
     
     # Score baseado em RSI
-    if 'rsi' in row and pd.notna(row['rsi']):
-        rsi = row['rsi']
-        if rsi < 25:
-            score += 100 * weights['rsi']
-            signals.append("🔥 RSI Extrema Sobrevenda")
-        elif rsi < 35:
-            score += 80 * weights['rsi']
-            signals.append("📉 RSI Sobrevenda")
-        elif rsi > 75:
-            score += 0 * weights['rsi']
-            signals.append("🎯 RSI Extrema Sobrecompra")
-        elif rsi > 65:
-            score += 20 * weights['rsi']
-            signals.append("📈 RSI Sobrecompra")
-        else:
-            score += 50 * weights['rsi']
+    rsi = df['rsi'].to_numpy(dtype=float)
+    conditions = [rsi < 25, rsi < 35, rsi > 75, rsi > 65]
+    yield (np.select(conditions + [~np.isnan(rsi)], [100, 80, 0, 20, 50], 0) * weights['rsi'],
+           conditions,
+           ["🔥 RSI Extrema Sobrevenda", "📉 RSI Sobrevenda",
+            "🎯 RSI Extrema Sobrecompra", "📈 RSI Sobrecompra"])
     
     # Score baseado em MACD
-    if 'macd_signal' in row and pd.notna(row['macd_signal']):
-        if row['macd_signal'] == 'COMPRA':
-            score += 80 * weights['macd']
-            signals.append("📊 MACD Compra")
-        elif row['macd_signal'] == 'VENDA':
-            score += 20 * weights['macd']
-            signals.append("📊 MACD Venda")
+    macd_signal = df['macd_signal'].to_numpy(dtype=object)
+    conditions = [macd_signal == 'COMPRA', macd_signal == 'VENDA']
+    yield (np.select(conditions, [80, 20], 0) * weights['macd'],
+           conditions,
+           ["📊 MACD Compra", "📊 MACD Venda"])
     
     # Score baseado em volume
-    if 'volume_spike' in row and pd.notna(row['volume_spike']):
-        if row['volume_spike'] > 2.0:
-            score += 90 * weights['volume']
-            signals.append("🚀 Volume Spike 2x+")
-        elif row['volume_spike'] > 1.5:
-            score += 70 * weights['volume']
-            signals.append("📈 Volume Aumentou 50%+")
+    volume_spike = df['volume_spike'].to_numpy(dtype=float)
+    conditions = [volume_spike > 2.0, volume_spike > 1.5]
+    yield (np.select(conditions, [90, 70], 0) * weights['volume'],
+           conditions,
+           ["🚀 Volume Spike 2x+", "📈 Volume Aumentou 50%+"])
     
     # Score baseado em volatilidade
-    if 'atr_pct' in row and pd.notna(row['atr_pct']):
-        if row['atr_pct'] < 2:
-            score += 80 * weights['volatility']
-            signals.append("⚡ Baixa Volatilidade")
-        elif row['atr_pct'] > 10:
-            score += 20 * weights['volatility']
-            signals.append("🌪️ Volatilidade Extrema")
-        elif row['atr_pct'] > 6:
-            score += 40 * weights['volatility']
-            signals.append("💨 Alta Volatilidade")
+    atr_pct = df['atr_pct'].to_numpy(dtype=float)
+    conditions = [atr_pct < 2, atr_pct > 10, atr_pct > 6]
+    yield (np.select(conditions, [80, 20, 40], 0) * weights['volatility'],
+           conditions,
+           ["⚡ Baixa Volatilidade", "🌪️ Volatilidade Extrema", "💨 Alta Volatilidade"])
     
     # Bônus por MA touch
-    if row.get('ma_touched', False):
-        score += 15
-        signals.append(f"🎯 {row.get('ma_touch_details', 'MA Touch')}")
-    
-    # Determinar sinal final
-    if score >= 80:
-        signal = "🚀 FORTE COMPRA"
-        color = "strong-buy"
-        confidence = "MUITO ALTA"
-    elif score >= 65:
-        signal = "🟢 COMPRA"
-        color = "buy"
-        confidence = "ALTA"
-    elif score >= 45:
-        signal = "⚪ NEUTRO"
-        color = "neutral"
-        confidence = "MÉDIA"
-    elif score >= 30:
-        signal = "🔴 VENDA"
-        color = "sell"
-        confidence = "ALTA"
-    else:
-        signal = "🚨 FORTE VENDA"
-        color = "strong-sell"
-        confidence = "MUITO ALTA"
-    
-    return {
-        'signal': signal,
-        'score': int(score),
-        'color': color,
-        'confidence': confidence,
-        'reasons': signals,
-        'components': {
-            'risk': risk_component,
-            'ma': score * weights['ma'],
-            'rsi': score * weights['rsi'],
-            'macd': score * weights['macd'],
-            'volume': score * weights['volume'],
-            'volatility': score * weights['volatility']
-        }
-    }
+    ma_touched = df['ma_touched'].astype(bool).to_numpy()
+    details = df['ma_touch_details'].astype(str).to_numpy()
+    yield (np.where(ma_touched, 15, 0),
+           [ma_touched],
+           [np.char.add("🎯 ", details)])
 
-def create_volume_analysis_tab():
+def generate_advanced_trading_signals(df):
+    """
+    Gera sinal de trading ultra avançado com múltiplos fatores para todas as moedas
+    
+    Cada fator é avaliado de uma vez sobre a coluna inteira (np.select no lugar
+    da cadeia de if/elif por linha). Os motivos ficam para signal_reasons, só
+    nas linhas exibidas.
+    
+    Args:
+        df (pandas.DataFrame): DataFrame com os indicadores das moedas
+        
+    Returns:
+        pandas.DataFrame: DataFrame com colunas 'trading_signal', 'signal_score',
+        'signal_color' e 'signal_confidence' adicionadas
+    """
+    df = df.copy(deep=False)
+    for column, default in SIGNAL_COLUMN_DEFAULTS.items():
+        if column not in df.columns:
+            df[column] = default
+    
+    score = 0
+    for points, _, _ in _signal_factors(df):
+        score = score + points
+    
+    # Determinar sinal final pela faixa do score
+    tier = np.searchsorted(SIGNAL_THRESHOLDS, score, side='right')
+    
+    df['trading_signal'] = pd.Categorical.from_codes(tier, dtype=SIGNAL_DTYPE)
+    df['signal_score'] = score.astype(int)
+    df['signal_color'] = pd.Categorical.from_codes(tier, dtype=SIGNAL_COLOR_DTYPE)
+    df['signal_confidence'] = pd.Categorical(SIGNAL_CONFIDENCES[tier], dtype=CONFIDENCE_DTYPE)
+    
+    return df
+
+def signal_reasons(df, limit=3):
+    """
+    Motivos do sinal de cada moeda, montados só para as linhas exibidas
+    
+    Args:
+        df (pandas.DataFrame): Linhas já processadas por generate_advanced_trading_signals
+        limit (int): Máximo de motivos por moeda (None para todos)
+        
+    Returns:
+        list: Motivos de cada linha unidos por ' • '
+    """
+    reasons = np.column_stack([np.select(conditions, labels, '')
+                               for _, conditions, labels in _signal_factors(df)])
+    return [' • '.join([reason for reason in row if reason][:limit])
+            for row in reasons.tolist()]
+
+@st.cache_data(ttl=API_CACHE['coins_list_ttl'], show_spinner=False)
+def load_enriched(min_volume, time_bucket, _progress_callback=None):
+    """
+    Carrega as moedas via fila e calcula todos os indicadores e sinais
+    
+    O resultado fica em cache por volume mínimo e janela de atualização, então
+    os reruns do Streamlit dentro da mesma janela não refazem requisições nem
+    cálculos.
+    
+    Args:
+        min_volume: Volume mínimo (USD) para manter a moeda
+        time_bucket: Índice da janela de atualização (parte da chave do cache)
+        _progress_callback: Progresso da análise de MA (fora da chave do cache)
+        
+    Returns:
+        pandas.DataFrame com indicadores e sinais (vazio se nenhuma moeda passar
+        no filtro), ou None se a API falhar
+    """
+    df = get_top_coins()
+    
+    if df.empty:
+        return None
+    
+    # Aplicar filtros
+    df = df[df['total_volume'] >= min_volume]
+    
+    # Nada a calcular: evita rodar os indicadores sobre um DataFrame vazio
+    if df.empty:
+        return df
+    
+    # Calcular indicadores (risco preenche colunas base usadas pelos demais)
+    df = calculate_risk_score(df)
+    df = calculate_leverage_suggestion(df)
+    
+    # Demais indicadores só leem as colunas base: rodam em paralelo (MA espera
+    # a rede; os outros passam a maior parte do tempo no NumPy, sem o GIL)
+    steps = [
+        volume_based_indicators,
+        partial(calculate_ma_indicators, progress_callback=_progress_callback),
+        calculate_momentum_indicators,
+        calculate_volatility_indicators,
+        calculate_advanced_indicators
+    ]
+    # Threads do pool herdam o contexto do script (cache e progresso do Streamlit)
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=len(steps),
+                            initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+                            ) as executor:
+        results = list(executor.map(lambda step: step(df), steps))
+    
+    # Juntar as colunas novas na ordem em que as etapas rodavam em sequência
+    base_columns = df.columns
+    for result in results:
+        for column in result.columns.difference(base_columns, sort=False):
+            df[column] = result[column]
+    
+    # Gerar sinais de trading
+    df = generate_advanced_trading_signals(df)
+    
+    # Cor da variação 24h dos cards, calculada uma vez junto com o cache
+    df['pct_color'] = np.where(df['price_change_percentage_24h'].to_numpy() > 0, '#00b09b', '#ff416c')
+    return df
+
+# Card de sinal da aba principal (preenchido com format_map por moeda)
+_CARD_TMPL = """
+<div class='dashboard-card'>
+    <div style='display: flex; justify-content: space-between; align-items: center;'>
+        <div>
+            <h3 style='margin: 0;'>{name} ({symbol_upper})</h3>
+            <p style='margin: 0.2rem 0; color: #666;'>Rank: #{market_cap_rank} | Volume: ${volume_m:.2f}M</p>
+        </div>
+        <div style='text-align: right;'>
+            <span class='signal-badge {signal_color}'>{trading_signal}</span>
+            <p style='margin: 0.2rem 0; font-size: 0.9rem;'>Confiança: {signal_confidence}</p>
+            <p style='margin: 0; font-size: 1.2rem; font-weight: bold;'>Score: {signal_score}/100</p>
+        </div>
+    </div>
+    
+    <div style='margin-top: 1rem;'>
+        <div style='display: flex; gap: 1rem; margin-bottom: 0.5rem;'>
+            <div><strong>Preço:</strong> ${current_price:.4f}</div>
+            <div><strong>24h:</strong> <span style='color: {pct_color}'>
+                {price_change_percentage_24h:+.2f}%</span></div>
+            <div><strong>RSI:</strong> {rsi_fmt}</div>
+            <div><strong>Volume Spike:</strong> {volume_spike:.2f}x</div>
+        </div>
+        
+        <div style='margin-top: 0.5rem;'>
+            <strong>Razões:</strong> {top_reasons}
+        </div>
+    </div>
+</div>
+"""
+
+def _top_k(df, column, k, largest=True):
+    """
+    As k linhas com maiores (ou menores) valores de `column`, já ordenadas
+    
+    np.argpartition seleciona as k em O(n) e só elas são ordenadas; NaN é
+    ignorado e empates mantêm a ordem original, como em nlargest/nsmallest.
+    """
+    values = df[column].to_numpy(dtype=float)
+    valid = np.flatnonzero(~np.isnan(values))
+    keys = -values[valid] if largest else values[valid]
+    
+    picked = np.arange(len(valid))
+    if 0 < k < len(valid):
+        # k-ésimo valor pelo particionamento; empates nele entram por posição
+        kth = keys[np.argpartition(keys, k - 1)[k - 1]]
+        ties = np.flatnonzero(keys == kth)
+        picked = np.concatenate([np.flatnonzero(keys < kth), ties])[:k]
+    picked = picked[np.lexsort((picked, keys[picked]))][:max(k, 0)]
+    return df.iloc[valid[picked]]
+
+def create_volume_analysis_tab(df):
     """Cria aba dedicada para análise de volume"""
     st.markdown("## 🔥 Análise de Volume em Tempo Real")
     
@@ -300,32 +450,36 @@ def create_volume_analysis_tab():
     
     # Top volume spikes
     st.markdown("### 🚀 Maiores Aumentos de Volume")
-    volume_spikes = df.nlargest(10, 'volume_spike')[['name', 'volume_spike', 
+    volume_spikes = _top_k(df, 'volume_spike', 10)[['name', 'volume_spike', 
                                                     'total_volume', 'current_price',
                                                     'price_change_percentage_24h']]
     
-    for _, coin in volume_spikes.iterrows():
+    for coin in volume_spikes.itertuples(index=False):
         with st.container():
             cols = st.columns([3, 2, 2, 2])
             with cols[0]:
-                st.markdown(f"**{coin['name']}**")
-                st.caption(f"Volume: ${coin['total_volume']/1e6:.2f}M")
+                st.markdown(f"**{coin.name}**")
+                st.caption(f"Volume: ${coin.total_volume/1e6:.2f}M")
             with cols[1]:
-                st.markdown(f"<div class='volume-pulse' style='background: linear-gradient(135deg, #ffa751 0%, #ffe259 100%); padding: 0.5rem; border-radius: 10px; color: #333; text-align: center; font-weight: bold;'>🔥 {coin['volume_spike']:.2f}x</div>", unsafe_allow_html=True)
+                st.markdown(f"<div class='volume-pulse' style='background: linear-gradient(135deg, #ffa751 0%, #ffe259 100%); padding: 0.5rem; border-radius: 10px; color: #333; text-align: center; font-weight: bold;'>🔥 {coin.volume_spike:.2f}x</div>", unsafe_allow_html=True)
             with cols[2]:
-                st.metric("Preço", f"${coin['current_price']:.2f}")
+                st.metric("Preço", f"${coin.current_price:.2f}")
             with cols[3]:
-                st.metric("24h", f"{coin['price_change_percentage_24h']:+.2f}%")
+                st.metric("24h", f"{coin.price_change_percentage_24h:+.2f}%")
     
     # Gráfico de volume spikes
-    fig = px.bar(volume_spikes, x='name', y='volume_spike',
-                 title="Top 10 Volume Spikes",
-                 color='volume_spike',
-                 color_continuous_scale='Oranges')
-    fig.update_layout(xaxis_tickangle=-45)
+    spikes = volume_spikes['volume_spike'].to_numpy()
+    fig = go.Figure(go.Bar(
+        x=volume_spikes['name'].to_numpy(),
+        y=spikes,
+        marker=dict(color=spikes, colorscale='Oranges', showscale=True,
+                    colorbar=dict(title='volume_spike'))
+    ))
+    fig.update_layout(title="Top 10 Volume Spikes", xaxis_title='name',
+                      yaxis_title='volume_spike', xaxis_tickangle=-45)
     st.plotly_chart(fig, use_container_width=True)
 
-def create_oversold_overbought_tab():
+def create_oversold_overbought_tab(df):
     """Cria aba dedicada para ativos sobrevendidos/sobrecomprados"""
     st.markdown("## 📊 Análise de Momentum Extremo")
     
@@ -338,7 +492,7 @@ def create_oversold_overbought_tab():
     with col1:
         st.markdown("### 📉 Ativos Sobrevendidos (RSI < 30)")
         if not oversold.empty:
-            for _, coin in oversold.nsmallest(5, 'rsi').iterrows():
+            for coin in _top_k(oversold, 'rsi', 5, largest=False).to_dict('records'):
                 with st.container():
                     st.markdown(f"""
                     <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 1rem; border-radius: 10px; margin: 0.5rem 0;'>
@@ -354,7 +508,7 @@ def create_oversold_overbought_tab():
     with col2:
         st.markdown("### 📈 Ativos Sobrecomprados (RSI > 70)")
         if not overbought.empty:
-            for _, coin in overbought.nlargest(5, 'rsi').iterrows():
+            for coin in _top_k(overbought, 'rsi', 5).to_dict('records'):
                 with st.container():
                     st.markdown(f"""
                     <div style='background: linear-gradient(135deg, #ff6b6b 0%, #ffa8a8 100%); padding: 1rem; border-radius: 10px; margin: 0.5rem 0;'>
@@ -369,16 +523,29 @@ def create_oversold_overbought_tab():
     
     # Gráfico RSI geral
     if 'rsi' in df.columns:
-        fig = px.scatter(df, x='current_price', y='rsi', 
-                        size='total_volume', color='rsi',
-                        hover_data=['name', 'price_change_percentage_24h'],
-                        title="RSI vs Preço - Todos os Ativos",
-                        color_continuous_scale='RdYlGn_r')
+        # Scattergl (WebGL) com arrays NumPy; tamanho por área como no px.scatter
+        rsi = df['rsi'].to_numpy()
+        volume = df['total_volume'].fillna(0).to_numpy()
+        fig = go.Figure(go.Scattergl(
+            x=df['current_price'].to_numpy(),
+            y=rsi,
+            mode='markers',
+            marker=dict(size=volume, sizemode='area',
+                        sizeref=2 * volume.max(initial=1) / 20 ** 2,
+                        color=rsi, colorscale='RdYlGn_r', showscale=True,
+                        colorbar=dict(title='rsi')),
+            customdata=np.column_stack([df['name'].to_numpy(),
+                                        df['price_change_percentage_24h'].to_numpy()]),
+            hovertemplate=("%{customdata[0]}<br>Preço: %{x}<br>RSI: %{y:.1f}"
+                           "<br>24h: %{customdata[1]:+.2f}%<extra></extra>")
+        ))
+        fig.update_layout(title="RSI vs Preço - Todos os Ativos",
+                          xaxis_title='current_price', yaxis_title='rsi')
         fig.add_hline(y=70, line_dash="dash", line_color="red", annotation_text="Sobrecomprado")
         fig.add_hline(y=30, line_dash="dash", line_color="green", annotation_text="Sobrevendido")
         st.plotly_chart(fig, use_container_width=True)
 
-def create_ma_analysis_tab():
+def create_ma_analysis_tab(df):
     """Cria aba dedicada para análise de Médias Móveis"""
     st.markdown("## 📊 Análise de Médias Móveis - Últimas 4 Horas")
     
@@ -398,14 +565,14 @@ def create_ma_analysis_tab():
     # Lista de ativos com MA touch
     st.markdown("### 🎯 Ativos que Tocaram MA de 200 Períodos")
     if not ma_touch_coins.empty:
-        for _, coin in ma_touch_coins.iterrows():
+        for coin in ma_touch_coins.to_dict('records'):
             with st.container():
                 cols = st.columns([3, 2, 2, 2])
                 with cols[0]:
                     st.markdown(f"**{coin['name']}**")
-                    st.caption(f"Detalhes: {coin.get('ma_touch_details', 'N/A')}")
+                    st.caption(f"Detalhes: {coin['ma_touch_details']}")
                 with cols[1]:
-                    distance = coin.get('ma_distance_pct', 0)
+                    distance = coin['ma_distance_pct']
                     color = "green" if distance > 0 else "red"
                     st.markdown(f"<div style='color: {color}; font-weight: bold;'>Distância: {distance:+.2f}%</div>", unsafe_allow_html=True)
                 with cols[2]:
@@ -442,37 +609,27 @@ def main():
         st.metric("Cache Hit Rate", f"{queue_status['efficiency']:.1f}%")
         st.metric("Tempo Médio Resp", f"{queue_status['avg_response_time']:.2f}s")
     
+    # Auto-refresh agendado pelo navegador: não prende a thread do script
+    if auto_refresh and st_autorefresh is not None:
+        st_autorefresh(interval=refresh_interval * 60 * 1000, key="crypto_refresh")
+    
     # Carregar dados com sistema de fila
     with st.spinner("🔄 Carregando dados via fila inteligente..."):
-        df = get_top_coins()
+        ma_progress = st.empty()
+        df = load_enriched(
+            min_volume,
+            int(time.time() // (refresh_interval * 60)),
+            _progress_callback=lambda done, total: ma_progress.text(
+                f"📊 Analisando MA: {done}/{total} moedas..."))
+        ma_progress.empty()
         
-        if df.empty:
+        if df is None:
             st.error("❌ Erro ao carregar dados. Verifique a conexão.")
             return
         
-        # Aplicar filtros
-        df = df[df['total_volume'] >= min_volume]
-        
-        # Calcular indicadores
-        df = calculate_risk_score(df)
-        df = calculate_leverage_suggestion(df)
-        df = volume_based_indicators(df)
-        df = calculate_ma_indicators(df)
-        df = calculate_momentum_indicators(df)
-        df = calculate_volatility_indicators(df)
-        df = calculate_advanced_indicators(df)
-        
-        # Gerar sinais de trading
-        trading_signals = []
-        for _, row in df.iterrows():
-            signal = generate_advanced_trading_signal(row)
-            trading_signals.append(signal)
-        
-        df['trading_signal'] = [s['signal'] for s in trading_signals]
-        df['signal_score'] = [s['score'] for s in trading_signals]
-        df['signal_color'] = [s['color'] for s in trading_signals]
-        df['signal_confidence'] = [s['confidence'] for s in trading_signals]
-        df['signal_reasons'] = [s['reasons'] for s in trading_signals]
+        if df.empty:
+            st.warning(f"⚠️ Nenhum ativo com volume ≥ ${min_volume:,}")
+            return
     
     # Dashboard principal
     st.markdown("## 📊 Dashboard Principal - Análise em Tempo Real")
@@ -508,48 +665,26 @@ def main():
         # Ordenar por score
         df_sorted = df.sort_values('signal_score', ascending=False)
         
-        for _, coin in df_sorted.iterrows():
-            signal_info = generate_advanced_trading_signal(coin)
-            
-            with st.container():
-                st.markdown(f"""
-                <div class='dashboard-card'>
-                    <div style='display: flex; justify-content: space-between; align-items: center;'>
-                        <div>
-                            <h3 style='margin: 0;'>{coin['name']} ({coin['symbol'].upper()})</h3>
-                            <p style='margin: 0.2rem 0; color: #666;'>Rank: #{coin.get('market_cap_rank', 'N/A')} | Volume: ${coin['total_volume']/1e6:.2f}M</p>
-                        </div>
-                        <div style='text-align: right;'>
-                            <span class='signal-badge {signal_info["color"]}'>{signal_info['signal']}</span>
-                            <p style='margin: 0.2rem 0; font-size: 0.9rem;'>Confiança: {signal_info['confidence']}</p>
-                            <p style='margin: 0; font-size: 1.2rem; font-weight: bold;'>Score: {signal_info['score']}/100</p>
-                        </div>
-                    </div>
-                    
-                    <div style='margin-top: 1rem;'>
-                        <div style='display: flex; gap: 1rem; margin-bottom: 0.5rem;'>
-                            <div><strong>Preço:</strong> ${coin['current_price']:.4f}</div>
-                            <div><strong>24h:</strong> <span style='color: {"#00b09b" if coin["price_change_percentage_24h"] > 0 else "#ff416c"}'>
-                                {coin["price_change_percentage_24h"]:+.2f}%</span></div>
-                            <div><strong>RSI:</strong> {coin.get('rsi', 'N/A'):.1f}</div>
-                            <div><strong>Volume Spike:</strong> {coin.get('volume_spike', 1):.2f}x</div>
-                        </div>
-                        
-                        <div style='margin-top: 0.5rem;'>
-                            <strong>Razões:</strong> {' • '.join(signal_info['reasons'][:3])}
-                        </div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+        # Campos derivados dos cards calculados por coluna, antes do template
+        cards = df_sorted.assign(
+            symbol_upper=df_sorted['symbol'].str.upper(),
+            volume_m=df_sorted['total_volume'].to_numpy(dtype=float) / 1e6,
+            rsi_fmt=df_sorted['rsi'].map('{:.1f}'.format, na_action='ignore').fillna('N/A'),
+            top_reasons=signal_reasons(df_sorted)
+        )
+        
+        # Cards montados em um único HTML: uma mensagem ao frontend em vez de uma por moeda
+        cards_html = [_CARD_TMPL.format_map(card) for card in cards.to_dict('records')]
+        st.markdown("\n".join(cards_html), unsafe_allow_html=True)
     
     with tab2:
-        create_volume_analysis_tab()
+        create_volume_analysis_tab(df)
     
     with tab3:
-        create_oversold_overbought_tab()
+        create_oversold_overbought_tab(df)
     
     with tab4:
-        create_ma_analysis_tab()
+        create_ma_analysis_tab(df)
     
     with tab5:
         # Tabela completa
@@ -557,14 +692,22 @@ def main():
         
         # Colunas para exibir
         display_columns = ['name', 'current_price', 'price_change_percentage_24h', 
-                          'total_volume', 'risk_score', 'rsi', 'volume_spike',
+                          'total_volume', 'risk_score', 'risk_level', 'rsi', 'volume_spike',
                           'trading_signal', 'signal_score']
         
-        display_df = df[display_columns].copy()
-        st.dataframe(display_df, use_container_width=True)
+        # Sem cópia (st.dataframe não altera o frame); formatação feita no cliente
+        st.dataframe(
+            df[display_columns],
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'current_price': st.column_config.NumberColumn(format='$%.4f'),
+                'total_volume': st.column_config.NumberColumn(format='$%.0f')
+            }
+        )
     
-    # Auto-refresh
-    if auto_refresh:
+    # Auto-refresh sem streamlit-autorefresh instalado
+    if auto_refresh and st_autorefresh is None:
         time.sleep(refresh_interval * 60)
         st.rerun()
 
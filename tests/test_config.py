@@ -0,0 +1,11 @@
+import pytest
+
+from data.config import RISK_CONFIG, validate_config
+
+RISK_WEIGHTS = ('volatility_weight', 'liquidity_weight', 'market_size_weight')
+
+def test_risk_weights_sum_to_one():
+    assert sum(RISK_CONFIG[key] for key in RISK_WEIGHTS) == pytest.approx(1.0)
+
+def test_default_config_is_valid():
+    assert list(validate_config()) == []
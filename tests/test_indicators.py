@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from analysis.indicators.momentum_indicators import calculate_momentum_indicators
+from analysis.indicators.volatility_indicators import calculate_volatility_indicators
+
+def _coins_without_id(n=5):
+    """DataFrame de moedas só com as colunas de 24h (sem id)"""
+    price = np.linspace(1.0, 100.0, n)
+    return pd.DataFrame({
+        'current_price': price,
+        'high_24h': price * 1.05,
+        'low_24h': price * 0.95,
+        'price_change_percentage_24h': np.linspace(-8.0, 8.0, n) + 0.5
+    })
+
+def test_momentum_without_id_column():
+    df = calculate_momentum_indicators(_coins_without_id())
+
+    assert len(df) == 5
+    assert np.isfinite(df['rsi'].to_numpy()).all()
+    assert (df['rsi'] != 50).any()
+
+def test_volatility_without_id_column():
+    df = calculate_volatility_indicators(_coins_without_id())
+
+    assert len(df) == 5
+    assert (df['atr_pct'] > 0).all()
+    assert (df['bb_width'] > 0).all()
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from analysis.risk_model import (calculate_liquidity_score, calculate_market_size_score,
+                                 calculate_risk_score, calculate_volatility_score)
+
+def _coins():
+    return pd.DataFrame({
+        'price_change_percentage_24h': [1.5, -7.2, np.nan, 0.0],
+        'total_volume': [3.5e10, 1.2e8, np.nan, 0.0],
+        'market_cap': [1.3e12, 4.0e9, 2.5e7, np.nan]
+    })
+
+def test_risk_score_is_float32():
+    df = calculate_risk_score(_coins())
+
+    assert df['risk_score'].dtype == np.float32
+    assert df['risk_score'].between(0, 100).all()
+
+def test_component_scores_stay_float32():
+    price_change = np.array([1.5, -7.2, 0.0], dtype=np.float32)
+    total_volume = np.array([3.5e10, 1.2e8, 0.0], dtype=np.float32)
+    market_cap = np.array([1.3e12, 4.0e9, 2.5e7], dtype=np.float32)
+
+    assert calculate_volatility_score(price_change).dtype == np.float32
+    assert calculate_liquidity_score(total_volume, market_cap).dtype == np.float32
+    assert calculate_market_size_score(market_cap).dtype == np.float32
+
+def test_component_fallbacks_stay_float32():
+    zeros = np.zeros(3, dtype=np.float32)
+
+    assert calculate_volatility_score(zeros).dtype == np.float32
+    assert calculate_liquidity_score(zeros, np.ones(3, dtype=np.float32)).dtype == np.float32
+    assert calculate_market_size_score(zeros).dtype == np.float32
@@ -0,0 +1,38 @@
+"""
+Compatibilidade opcional com Numba
+
+Se o numba estiver instalado, `njit` compila a função para código nativo;
+caso contrário o decorador devolve a função Python original e o código
+continua funcionando (apenas mais lento).
+
+Kernels com `parallel=True` dividem as moedas entre os núcleos (prange);
+PERFORMANCE_CONFIG['parallel_processing'] desligado os limita a uma thread.
+A camada de threads padrão do numba (workqueue) não aceita chamadas paralelas
+vindas de várias threads ao mesmo tempo: esses kernels rodam sob PARALLEL_LOCK.
+"""
+
+import threading
+
+from data.config import PERFORMANCE_CONFIG
+
+try:
+    from numba import njit, prange, set_num_threads
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Decorador no-op usado quando o numba não está instalado"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
+
+# Serializa os kernels `parallel=True` chamados de threads diferentes
+PARALLEL_LOCK = threading.Lock()
+
+if NUMBA_AVAILABLE and not PERFORMANCE_CONFIG['parallel_processing']:
+    set_num_threads(1)
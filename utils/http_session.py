@@ -0,0 +1,105 @@
+"""
+Sessões HTTP para a CoinGecko
+
+Com requests-cache instalado as respostas ficam em um cache SQLite em disco,
+compartilhado por todos os processos do Streamlit, com os TTLs de API_CACHE.
+O rate limit é aplicado no adapter, ou seja, só nas requisições que de fato
+saem para a rede (respostas do cache não consomem vaga).
+"""
+
+import threading
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from data.config import API_CACHE
+from utils.rate_limit import acquire
+
+try:
+    from requests_cache import CachedSession
+except ImportError:
+    CachedSession = None
+
+class RateLimitedAdapter(HTTPAdapter):
+    """Adapter com pool de conexões que aguarda o rate limit antes de cada envio"""
+
+    def send(self, request, **kwargs):
+        acquire()
+        return super().send(request, **kwargs)
+
+def create_http_session(pool_size=16):
+    """
+    Cria sessão HTTP com pool de conexões (keep-alive) para a CoinGecko
+
+    Args:
+        pool_size: Conexões mantidas abertas por host
+
+    Returns:
+        requests.Session (CachedSession quando requests-cache está instalado)
+    """
+    if CachedSession is not None:
+        session = CachedSession(
+            API_CACHE['http_cache_path'],
+            backend='sqlite',
+            expire_after=API_CACHE['coins_list_ttl'],
+            urls_expire_after={'*/coins/*/market_chart*': API_CACHE['coin_history_ttl']},
+            # Entrada vencida há pouco é devolvida na hora e renovada em segundo plano
+            stale_while_revalidate=API_CACHE['stale_while_revalidate']
+        )
+    else:
+        session = requests.Session()
+
+    adapter = RateLimitedAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    return session
+
+# TTL adaptativo do histórico: amplitude diária (%) -> segundos em cache.
+# Moedas calmas ficam até 30 min; as voláteis seguem com 5 min
+ADAPTIVE_TTL_VOLATILITY = [0.5, 2.0, 5.0]
+ADAPTIVE_TTL_SECONDS = [1800, 600, 300]
+
+# Amplitude diária mais recente de cada moeda (coin_id -> %)
+_coin_volatility = {}
+
+def adaptive_ttl(atr_pct):
+    """TTL em segundos para a volatilidade `atr_pct` (interpolação linear)"""
+    return int(np.interp(atr_pct, ADAPTIVE_TTL_VOLATILITY, ADAPTIVE_TTL_SECONDS))
+
+def record_volatility(coin_ids, atr_pct):
+    """
+    Registra a volatilidade recente das moedas para o TTL adaptativo
+
+    Args:
+        coin_ids: IDs das moedas
+        atr_pct: Amplitude diária (high - low) em % do preço de cada moeda
+    """
+    _coin_volatility.update(
+        (coin_id, value) for coin_id, value in zip(coin_ids, atr_pct)
+        if not np.isnan(value)
+    )
+
+def history_ttl(coin_id):
+    """TTL do histórico da moeda (fixo se desativado ou sem volatilidade registrada)"""
+    atr_pct = _coin_volatility.get(coin_id)
+    if not API_CACHE['adaptive'] or atr_pct is None:
+        return API_CACHE['coin_history_ttl']
+    return adaptive_ttl(atr_pct)
+
+def get_history(session, url, coin_id, **kwargs):
+    """GET do histórico da moeda com o TTL adaptativo quando a sessão tem cache"""
+    if CachedSession is not None and isinstance(session, CachedSession):
+        kwargs['expire_after'] = history_ttl(coin_id)
+    return session.get(url, **kwargs)
+
+# Sessão compartilhada pelas chamadas sem sessão própria
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+def get_shared_session():
+    """Retorna a sessão HTTP única do processo (criada no primeiro uso)"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_http_session()
+        return _shared_session
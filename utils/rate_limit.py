@@ -0,0 +1,144 @@
+"""
+Limitadores de taxa das requisições à API CoinGecko
+
+O algoritmo é escolhido em API_RATE_LIMIT['algorithm']; `acquire()` usa um
+limitador único compartilhado por todas as chamadas HTTP do processo.
+"""
+
+import time
+import threading
+
+from data.config import API_LIMITS, API_RATE_LIMIT, GCRA_CONFIG
+
+class TokenBucket:
+    """
+    Token bucket: rajadas de até `capacity` requisições e taxa média de
+    `refill_rate` tokens por segundo
+    """
+
+    def __init__(self, capacity, refill_rate):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = float(capacity)
+        self.last_refill_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Reabastece com o tempo decorrido (chamar com o lock)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.last_refill_time) * self.refill_rate)
+        self.last_refill_time = now
+
+    def available(self):
+        """Tokens disponíveis agora"""
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+    def consume(self, n=1):
+        """
+        Tenta consumir `n` tokens
+
+        Returns:
+            0 se liberado, senão segundos até haver tokens suficientes
+        """
+        with self._lock:
+            self._refill()
+            if self.tokens >= n:
+                self.tokens -= n
+                return 0
+            return (n - self.tokens) / self.refill_rate
+
+    def acquire(self, n=1):
+        """Bloqueia só o necessário até consumir `n` tokens"""
+        while True:
+            wait = self.consume(n)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+class GCRA:
+    """
+    Generic Cell Rate Algorithm: guarda só o instante teórico de chegada
+    (TAT) da próxima requisição e admite rajadas de até `burst`
+    """
+
+    def __init__(self, emission_interval, burst):
+        self.emission_interval = emission_interval
+        self.tau = emission_interval * burst
+        self.tat = 0.0
+        self._lock = threading.Lock()
+
+    def check(self, now):
+        """
+        Admite uma requisição no instante `now` (relógio monotônico)
+
+        Returns:
+            0 se admitida, senão segundos até a próxima admissão
+        """
+        with self._lock:
+            new_tat = max(self.tat, now) + self.emission_interval
+            deficit = new_tat - now - self.tau
+            if deficit > 0:
+                return deficit
+            self.tat = new_tat
+            return 0.0
+
+    def acquire(self, n=1):
+        """Bloqueia só quando o GCRA devolve espera positiva"""
+        for _ in range(n):
+            while True:
+                wait = self.check(time.monotonic())
+                if wait <= 0:
+                    break
+                time.sleep(wait)
+
+class MinIntervalLimiter:
+    """Intervalo fixo entre requisições (comportamento original)"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.next_allowed = 0.0
+        self._lock = threading.Lock()
+
+    def consume(self, n=1):
+        """Reserva a próxima vaga; retorna 0 se liberado ou segundos de espera"""
+        with self._lock:
+            now = time.monotonic()
+            if now >= self.next_allowed:
+                self.next_allowed = now + self.min_interval * n
+                return 0
+            return self.next_allowed - now
+
+    def acquire(self, n=1):
+        """Bloqueia até a próxima vaga"""
+        while True:
+            wait = self.consume(n)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+def create_rate_limiter(algorithm=None):
+    """
+    Cria o limitador configurado
+
+    Args:
+        algorithm: 'gcra', 'token_bucket' ou 'min_interval'
+            (padrão: API_RATE_LIMIT['algorithm'])
+    """
+    algorithm = algorithm or API_RATE_LIMIT.get('algorithm', 'min_interval')
+    limit = API_LIMITS['free_tier_limit']
+
+    if algorithm == 'gcra':
+        return GCRA(GCRA_CONFIG['period'] / GCRA_CONFIG['limit'], GCRA_CONFIG['burst'])
+    if algorithm == 'token_bucket':
+        return TokenBucket(limit, limit / 60)
+    return MinIntervalLimiter(API_RATE_LIMIT['min_interval'])
+
+# Limitador compartilhado pelas chamadas à API
+_api_limiter = create_rate_limiter()
+
+def acquire(n=1):
+    """Aguarda vaga no limite da API antes de uma requisição"""
+    _api_limiter.acquire(n)